@@ -0,0 +1,164 @@
+'''
+asyncio API for wayID.
+
+    result = await aio.verify(upload_bytes, timeout=10, first_name="...", last_name="...")
+
+verify() never runs image work on the event loop. With thread executors (the
+default) one verification is split into branches that run concurrently:
+preprocess -> OCR -> text validation, JPEG/EXIF metadata, headshot, and
+error-level analysis. The OpenCV/numpy stages go to the CPU executor and
+OCR, which mostly waits on tesseract, goes to its own OCR executor, so a
+burst of OCR-heavy images cannot starve image analysis. A result-cache hit
+(see resultcache.py) skips every branch except text validation. With a
+ProcessPoolExecutor the whole verification runs as one job in a worker
+process.
+
+On timeout or cancellation the stages that have not started are cancelled
+and later stages are never scheduled. A stage that is already running in a
+thread finishes in the background (it cannot be interrupted), but its result
+is discarded and the caller is released immediately.
+'''
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+import instrument
+from wayID import wayID
+
+# Process-wide default executors, created on first use (see configure())
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def configure(cpu_executor=None, ocr_executor=None):
+    '''
+    Set the default executors for verify(); None keeps the current one.
+
+    cpu_executor may be a ThreadPoolExecutor (stages fan out across threads)
+    or a ProcessPoolExecutor (each verification runs whole in one worker).
+    Create a process pool with mp_context=multiprocessing.get_context("spawn"):
+    forking a process that already runs analysis threads can deadlock the child.
+    '''
+    with _executors_lock:
+        if cpu_executor is not None:
+            _executors["cpu"] = cpu_executor
+        if ocr_executor is not None:
+            _executors["ocr"] = ocr_executor
+
+
+def _default_executor(kind):
+    with _executors_lock:
+        if kind not in _executors:
+            cpus = os.cpu_count() or 1
+            # OCR threads mostly wait on tesseract, so there can be more of them
+            _executors[kind] = ThreadPoolExecutor(max_workers=cpus if kind == "cpu" else cpus * 2,
+                                                  thread_name_prefix=f"wayid-aio-{kind}")
+        return _executors[kind]
+
+
+def _build(source, options):
+    '''
+    A wayID for bytes, a path, a decoded array or a binary file object; decodes the image
+    '''
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return wayID.from_bytes(source, **options)
+    if isinstance(source, np.ndarray):
+        return wayID.from_array(source, **options)
+    if isinstance(source, (str, os.PathLike)):
+        way = wayID(os.fspath(source), **options)
+        way.context
+        return way
+    return wayID.from_file(source, **options)
+
+
+def _verify_whole(source, options, timings, memory):
+    '''
+    Process-pool entry point: one complete verification
+    '''
+    return _build(source, options).verify(timings=timings, memory=memory)
+
+
+async def _text_branch(loop, way, cpu, ocr_executor):
+    timed = way._recorder.timed
+    processed_image = await loop.run_in_executor(cpu, timed, "preprocess", way._preprocess_image)
+    extracted_text = await loop.run_in_executor(ocr_executor, timed, "ocr",
+                                                way._extract_text_from_image, processed_image)
+    validation_result = await loop.run_in_executor(cpu, timed, "text_validation",
+                                                   way._validate_dl_text, extracted_text)
+    return extracted_text, validation_result
+
+
+async def _run_branches(loop, way, rec, cpu, ocr_executor):
+    # Every branch works on the rectified card; find it once before fanning out
+    ctx = way.context
+    await loop.run_in_executor(cpu, rec.timed, "card_detection", lambda: ctx.canonical)
+
+    branches = [
+        asyncio.ensure_future(_text_branch(loop, way, cpu, ocr_executor)),
+        loop.run_in_executor(cpu, rec.timed, "metadata", way._analyze_metadata),
+        loop.run_in_executor(cpu, rec.timed, "headshot", way._validate_headshot, ctx.card),
+        loop.run_in_executor(cpu, rec.timed, "tamper", way._check_card_tampering),
+    ]
+    try:
+        (extracted_text, validation_result), metadata, headshot, tamper = await asyncio.gather(*branches)
+    except BaseException:
+        # gather only cancels its children when it is cancelled itself, not when one fails
+        for branch in branches:
+            branch.cancel()
+        raise
+    return extracted_text, validation_result, metadata, headshot, tamper
+
+
+async def _verify_staged(loop, source, options, cpu, ocr_executor, timings, memory):
+    way = await loop.run_in_executor(cpu, _build, source, options)
+    rec = way._start_verification(timings, memory)
+    with instrument.measure(rec, way.image_path):
+        cache = way._result_cache()
+        analysis = None
+        if cache is not None:
+            key, analysis = await loop.run_in_executor(cpu, rec.timed, "cache_lookup", way._cache_lookup, cache)
+        stopped = await loop.run_in_executor(cpu, way._check_near_duplicates, analysis)
+        if stopped is not None:
+            result = stopped
+        elif analysis is not None:
+            result = await loop.run_in_executor(cpu, way._verify_cached, analysis)
+        else:
+            stages = await _run_branches(loop, way, rec, cpu, ocr_executor)
+            if cache is not None:
+                await loop.run_in_executor(cpu, rec.timed, "cache_store", way._cache_store, cache, key, stages)
+            result = way._build_result(*stages)
+    return way._finish_verification(result)
+
+
+async def verify(source, *, timeout=None, deadline=None, cpu_executor=None, ocr_executor=None,
+                 timings=None, memory=None, **options):
+    '''
+    Verify one image without blocking the event loop; returns a VerificationResult.
+
+    source is encoded bytes, a file path, a decoded BGR array or a binary file
+    object. options are wayID keyword arguments: the applicant fields and
+    ocr_backend / ocr_mode / preprocess_mode. timeout is in seconds; deadline
+    is an absolute loop.time() and the earlier of the two applies. When the
+    time runs out the pending stages are cancelled and TimeoutError is raised.
+    timings/memory are as for wayID.verify().
+    '''
+    loop = asyncio.get_running_loop()
+    if deadline is not None:
+        remaining = max(0.0, deadline - loop.time())
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    cpu = cpu_executor or _default_executor("cpu")
+
+    if isinstance(cpu, ProcessPoolExecutor):
+        if isinstance(source, memoryview):
+            source = bytes(source)
+        elif not isinstance(source, (bytes, bytearray, memoryview, str, os.PathLike, np.ndarray)):
+            # File objects cannot be sent to another process; read it off the loop first
+            source = await loop.run_in_executor(None, source.read)
+        job = loop.run_in_executor(cpu, _verify_whole, source, options, timings, memory)
+    else:
+        job = _verify_staged(loop, source, options, cpu, ocr_executor or _default_executor("ocr"),
+                             timings, memory)
+    return await asyncio.wait_for(job, timeout)
@@ -0,0 +1,203 @@
+'''
+Deterministic synthetic driver's-license corpus for benchmarks.
+
+Each card is drawn from a seed: a tinted background with a rainbow band,
+a state header, a face-like photo, name/address/DOB fields, a barcode and
+microtext lines. It is placed on a desk-coloured scene with a small
+rotation, rendered at the requested megapixel size and JPEG-encoded at the
+requested quality. The same (seed, megapixels, quality) always gives the
+same image (byte-identical JPEGs with the same OpenCV/libjpeg build), so
+benchmark runs on different machines see the same input.
+
+    python benchmarks/corpus.py --out /tmp/corpus --sizes 1 3 12 --qualities 70 92
+'''
+import argparse
+import json
+import os
+
+import cv2
+import numpy as np
+
+CARD_SIZE = (1011, 638)   # CR-80 card at 300 DPI
+FIRST_NAMES = ("JOHN", "MARIA", "WEI", "FATIMA", "DAVID", "AISHA", "LUCAS", "PRIYA")
+LAST_NAMES = ("SMITH", "GARCIA", "CHEN", "KHAN", "JOHNSON", "OKAFOR", "SILVA", "PATEL")
+STREETS = ("MAIN ST", "OAK AVE", "PARK RD", "ELM BLVD", "HILL ST")
+STATES = (("CALIFORNIA", "CA", "90210"), ("TEXAS", "TX", "75001"), ("NEW YORK", "NY", "10001"),
+          ("FLORIDA", "FL", "32004"), ("HAWAII", "HI", "96820"))
+
+
+def _applicant(rng):
+    state, abbrev, zip_code = STATES[rng.integers(len(STATES))]
+    return {
+        "first_name": FIRST_NAMES[rng.integers(len(FIRST_NAMES))],
+        "last_name": LAST_NAMES[rng.integers(len(LAST_NAMES))],
+        "street_address": f"{rng.integers(10, 9999)} {STREETS[rng.integers(len(STREETS))]}",
+        "street_city": "SPRINGFIELD",
+        "street_state": abbrev,
+        "street_zip": zip_code,
+        "date_of_birth": f"{rng.integers(1, 13):02d}/{rng.integers(1, 29):02d}/{rng.integers(1950, 2005)}",
+        "_state_name": state,
+    }
+
+
+def draw_card(rng, info):
+    '''
+    One upright BGR card at CARD_SIZE for the given applicant fields
+    '''
+    width, height = CARD_SIZE
+    tint = rng.integers(200, 250, 3)
+    ramp = np.linspace(0.9, 1.0, width, dtype=np.float32)[None, :, None]
+    card = (np.broadcast_to(tint, (height, width, 3)) * ramp).astype(np.uint8)
+
+    # Hologram-like rainbow band
+    hue = ((np.arange(width) * 180 // width + rng.integers(180)) % 180).astype(np.uint8)
+    band = np.stack([np.tile(hue, (60, 1)), np.full((60, width), 120, np.uint8),
+                     np.full((60, width), 250, np.uint8)], axis=2)
+    top = int(rng.integers(200, 400))
+    card[top:top + 60] = cv2.addWeighted(card[top:top + 60], 0.6, cv2.cvtColor(band, cv2.COLOR_HSV2BGR), 0.4, 0)
+
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    cv2.putText(card, info["_state_name"], (330, 80), font, 1.6, (120, 40, 10), 4, cv2.LINE_AA)
+    cv2.putText(card, "DRIVER LICENSE", (330, 120), font, 0.9, (120, 40, 10), 2, cv2.LINE_AA)
+
+    # Photo: plain backdrop, skin-toned face ellipse, darker hair and shoulders
+    cv2.rectangle(card, (30, 40), (300, 400), (200, 170, 140), -1)
+    skin = tuple(int(c) for c in rng.integers(90, 200, 3))
+    cv2.ellipse(card, (165, 200), (75, 100), 0, 0, 360, skin, -1)
+    cv2.ellipse(card, (165, 130), (80, 50), 0, 180, 360, (40, 30, 30), -1)
+    cv2.circle(card, (135, 190), 8, (40, 40, 40), -1)
+    cv2.circle(card, (195, 190), 8, (40, 40, 40), -1)
+    cv2.ellipse(card, (165, 250), (25, 8), 0, 0, 180, (60, 60, 120), 3)
+    cv2.ellipse(card, (165, 420), (130, 90), 0, 180, 360, (80, 80, 140), -1)
+
+    lines = [
+        f"DOB {info['date_of_birth']}  EXP 01/01/2030",
+        f"{info['last_name']}, {info['first_name']}",
+        info["street_address"],
+        f"{info['street_city']}, {info['street_state']} {info['street_zip']}",
+        f"DL {rng.integers(100000000, 999999999)}  CLASS C",
+    ]
+    for row, text in enumerate(lines):
+        cv2.putText(card, text, (330, 180 + row * 45), font, 0.8, (20, 20, 20), 2, cv2.LINE_AA)
+
+    # Microtext and barcode
+    for row in range(3):
+        cv2.putText(card, "SECURE DOCUMENT " * 8, (330, 450 + row * 12), font, 0.25, (90, 90, 90), 1, cv2.LINE_AA)
+    x = 30
+    while x < 300:
+        bar = int(rng.integers(1, 5))
+        if rng.random() < 0.55:
+            cv2.rectangle(card, (x, 480), (x + bar, 600), (0, 0, 0), -1)
+        x += bar
+    cv2.putText(card, info["first_name"][0] + info["last_name"].title(), (700, 560),
+                cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, 1.2, (30, 30, 30), 2, cv2.LINE_AA)
+
+    noise = rng.normal(0, 3, card.shape).astype(np.int16)
+    return np.clip(card.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def render(seed, megapixels, quality, desk=None):
+    '''
+    (JPEG bytes, applicant info) for one synthetic capture
+
+    desk: optional BGR image (resized to the capture) to lay the card on
+    instead of a plain colour; the card and its placement stay the same.
+    '''
+    rng = np.random.default_rng(seed)
+    info = _applicant(rng)
+    card = draw_card(rng, info)
+
+    # 4:3 capture in which the card fills roughly half the width, slightly rotated
+    height = int(round((megapixels * 1e6 * 3 / 4) ** 0.5))
+    width = height * 4 // 3
+    scale = width * rng.uniform(0.45, 0.65) / CARD_SIZE[0]
+    angle = rng.uniform(-8, 8)
+    matrix = cv2.getRotationMatrix2D((CARD_SIZE[0] / 2, CARD_SIZE[1] / 2), angle, scale)
+    matrix[:, 2] += (width / 2 - CARD_SIZE[0] / 2, height / 2 - CARD_SIZE[1] / 2)
+    desk_colour = tuple(int(c) for c in rng.integers(40, 120, 3))
+    if desk is None:
+        scene = cv2.warpAffine(card, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_CONSTANT, borderValue=desk_colour)
+    else:
+        scene = cv2.resize(desk, (width, height), interpolation=cv2.INTER_AREA)
+        cv2.warpAffine(card, matrix, (width, height), dst=scene, flags=cv2.INTER_LINEAR,
+                       borderMode=cv2.BORDER_TRANSPARENT)
+
+    ok, encoded = cv2.imencode(".jpg", scene, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    info = {key: value for key, value in info.items() if not key.startswith("_")}
+    return encoded.tobytes(), info
+
+
+def resave(data, quality):
+    '''
+    Decode JPEG bytes and encode them again at quality, as an image editor's export does
+    '''
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return encoded.tobytes()
+
+
+def splice(seed, megapixels, quality, export_quality, desk=None):
+    '''
+    (JPEG bytes, (x, y, w, h) of the pasted area) for a tampered capture
+
+    The render(seed, megapixels, quality) capture gets a fresh, never
+    compressed photo (smooth shading plus camera noise) pasted over the middle
+    of the card and is exported at export_quality. resave() of the same
+    capture at export_quality is its untampered counterpart. desk is passed
+    on to render().
+    '''
+    data, _ = render(seed, megapixels, quality, desk)
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    rng = np.random.default_rng(seed + 1)
+    height, width = image.shape[:2]
+    ph, pw = height // 6, width // 8
+    shading = cv2.GaussianBlur(rng.normal(0, 60, (ph, pw, 3)).astype(np.float32), (0, 0), 6)
+    photo = (shading - shading.mean()) * 3 + 140 + rng.normal(0, 6, (ph, pw, 3))
+    # Off the 8x8 JPEG grid, as a hand-placed paste would be
+    x, y = width // 2 - pw // 2 + 5, height // 2 - ph // 2 + 3
+    image[y:y + ph, x:x + pw] = np.clip(photo, 0, 255).astype(np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(export_quality)])
+    if not ok:
+        raise RuntimeError("JPEG encoding failed")
+    return encoded.tobytes(), (x, y, pw, ph)
+
+
+def generate(count, sizes, qualities, seed=0):
+    '''
+    Yield (name, megapixels, quality, jpeg_bytes, info) for every combination, lazily
+    '''
+    for megapixels in sizes:
+        for quality in qualities:
+            for index in range(count):
+                item_seed = seed * 1_000_003 + index
+                data, info = render(item_seed, megapixels, quality)
+                yield f"synthetic_{megapixels:g}mp_q{quality}_{index:03d}.jpg", megapixels, quality, data, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", required=True, help="Directory to write the JPEGs and input.json to")
+    parser.add_argument("--count", type=int, default=5, help="Images per size/quality combination")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 3, 12], help="Capture sizes in megapixels")
+    parser.add_argument("--qualities", type=int, nargs="+", default=[70, 92], help="JPEG qualities")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    manifest = {}
+    for name, _, _, data, info in generate(args.count, args.sizes, args.qualities, args.seed):
+        with open(os.path.join(args.out, name), "wb") as f:
+            f.write(data)
+        manifest[name] = info
+    with open(os.path.join(args.out, "input.json"), "w") as f:
+        json.dump(manifest, f, indent=4)
+    print(f"Wrote {len(manifest)} images to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
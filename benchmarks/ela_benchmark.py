@@ -0,0 +1,110 @@
+'''
+Measure the cost of error-level analysis (_detect_photo_tampering) per megapixel.
+
+The sample card is resized to several capture sizes; for each size this
+prints the best-of-N wall time and the resulting milliseconds per megapixel,
+which should stay roughly flat if ELA cost is linear in pixel count.
+
+--calibrate instead runs the card-scoped check on the synthetic corpus: clean
+captures at each size and quality, the same captures re-saved at
+--export-quality, and spliced copies (corpus.splice). For each group it prints
+the 99th-percentile heatmap peak (the value ELA_PEAK_BASELINE is set above),
+the resulting scores and the largest suspicious block count.
+
+    python benchmarks/ela_benchmark.py --sizes 1 3 6 12 --repeat 5
+    python benchmarks/ela_benchmark.py --calibrate --count 8 --sizes 1 3 12
+'''
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import wayID as wayid_module  # noqa: E402
+from corpus import render, resave, splice  # noqa: E402
+from wayID import wayID  # noqa: E402
+
+
+def timing(args):
+    original = cv2.imread(args.image, cv2.IMREAD_COLOR)
+    aspect = original.shape[1] / original.shape[0]
+    for megapixels in args.sizes:
+        height = int((megapixels * 1e6 / aspect) ** 0.5)
+        image = cv2.resize(original, (int(height * aspect), height), interpolation=cv2.INTER_CUBIC)
+        actual = image.shape[0] * image.shape[1] / 1e6
+
+        best = float("inf")
+        for _ in range(args.repeat):
+            way = wayID.from_array(image)
+            way.context.gray  # Decode-side work is not part of ELA
+            start = time.perf_counter()
+            score, _ = way._detect_photo_tampering(way.context)
+            best = min(best, time.perf_counter() - start)
+        print(f"{actual:5.1f} MP  {best * 1000:8.1f} ms  {best * 1000 / actual:6.1f} ms/MP  score {score:.1f}")
+
+
+def measure(data):
+    '''
+    (99th-percentile peak, score, suspicious blocks) of the card-scoped check on JPEG bytes
+    '''
+    way = wayID.from_bytes(data)
+    score, blocks = way._check_card_tampering()
+    # score is linear in the peak until it clips, so the peak can be read back from it
+    baseline, scale = wayid_module.ELA_PEAK_BASELINE, wayid_module.ELA_SCORE_SCALE
+    wayid_module.ELA_PEAK_BASELINE, wayid_module.ELA_SCORE_SCALE = 0.0, 1.0
+    try:
+        peak, _ = way._check_card_tampering()
+    finally:
+        wayid_module.ELA_PEAK_BASELINE, wayid_module.ELA_SCORE_SCALE = baseline, scale
+    return peak, score, blocks
+
+
+def calibrate(args):
+    groups = {}
+    for megapixels in args.sizes:
+        for quality in args.qualities:
+            for index in range(args.count):
+                seed = args.seed * 1_000_003 + index
+                data, _ = render(seed, megapixels, quality)
+                groups.setdefault(f"clean q{quality}", []).append(measure(data))
+                groups.setdefault(f"re-saved q{quality}->{args.export_quality}", []).append(
+                    measure(resave(data, args.export_quality)))
+                spliced, _ = splice(seed, megapixels, quality, args.export_quality)
+                groups.setdefault(f"spliced q{quality}->{args.export_quality}", []).append(measure(spliced))
+        print(f"{megapixels:g} MP done", file=sys.stderr)
+
+    print(f"{'group':<24} {'n':>3}  {'peak min':>8} {'peak p50':>8} {'peak max':>8}  "
+          f"{'score min':>9} {'score max':>9}  {'blocks max':>10}")
+    for name, rows in groups.items():
+        peaks, scores, blocks = (np.array(column) for column in zip(*rows))
+        print(f"{name:<24} {len(rows):>3}  {peaks.min():8.2f} {np.median(peaks):8.2f} {peaks.max():8.2f}  "
+              f"{scores.min():9.1f} {scores.max():9.1f}  {blocks.max():10d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", default="testing/dl_images/fake_id.jpg")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 3, 6, 12],
+                        help="Capture sizes in megapixels")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--calibrate", action="store_true",
+                        help="Report score distributions on the synthetic corpus instead of timings")
+    parser.add_argument("--count", type=int, default=8, help="Corpus images per size/quality (--calibrate)")
+    parser.add_argument("--qualities", type=int, nargs="+", default=[70, 85, 92],
+                        help="Capture JPEG qualities (--calibrate)")
+    parser.add_argument("--export-quality", type=int, default=98,
+                        help="Quality the re-saved and spliced copies are exported at (--calibrate)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.calibrate:
+        calibrate(args)
+    else:
+        timing(args)
+
+
+if __name__ == "__main__":
+    main()
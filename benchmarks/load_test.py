@@ -0,0 +1,106 @@
+'''
+Load-test a running service.py with the synthetic corpus.
+
+Sends --requests POST /verify calls from --concurrency client threads and
+reports status-code counts, throughput and p50/p95/p99 latency per status.
+Expect some 429s once concurrency exceeds the service's workers + queue.
+
+    python service.py --workers 4 --queue 4 &
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --concurrency 16 --requests 200
+'''
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+from corpus import generate  # noqa: E402
+
+
+def encode_multipart(data, info):
+    '''
+    (body, content type) for a multipart form with the image and applicant fields
+    '''
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in info.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="id.jpg"\r\n'
+                 f'Content-Type: image/jpeg\r\n\r\n'.encode() + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def post(url, body, content_type, timeout):
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": content_type}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except OSError:
+        return "connection error"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--images", type=int, default=4, help="Distinct corpus images to cycle through")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[3])
+    parser.add_argument("--client-timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    bodies = [encode_multipart(data, info)
+              for _, _, _, data, info in generate(args.images, args.sizes, [90])]
+    url = args.url.rstrip("/") + "/verify"
+    latencies = defaultdict(list)
+    counter = iter(range(args.requests))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            body, content_type = bodies[index % len(bodies)]
+            start = time.perf_counter()
+            status = post(url, body, content_type, args.client_timeout)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[status].append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    counts = Counter({status: len(values) for status, values in latencies.items()})
+    print(f"{args.requests} requests in {wall:.1f}s, {counts.get(200, 0) / wall:.2f} verified/s")
+    for status, values in sorted(latencies.items(), key=lambda item: str(item[0])):
+        p50, p95, p99 = np.percentile(np.asarray(values) * 1000, (50, 95, 99))
+        print(f"  {status}: {len(values):5d}   p50 {p50:8.1f} ms   p95 {p95:8.1f} ms   p99 {p99:8.1f} ms")
+    try:
+        with urllib.request.urlopen(args.url.rstrip("/") + "/health", timeout=5) as response:
+            print("health:", json.dumps(json.load(response)))
+    except OSError:
+        pass
+
+
+if __name__ == "__main__":
+    main()
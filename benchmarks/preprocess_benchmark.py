@@ -0,0 +1,89 @@
+'''
+Compare the "fast" and "quality" OCR preprocessing modes on the sample corpus.
+
+For every image (optionally upscaled to mimic large phone captures) this
+reports the per-stage time of each mode, how many pixels of the two binary
+images agree, and - when tesseract is installed - how similar the OCR text is.
+
+    python benchmarks/preprocess_benchmark.py
+    python benchmarks/preprocess_benchmark.py --scales 1 4 --repeat 3
+'''
+import argparse
+import os
+import statistics
+import sys
+
+import cv2
+from fuzzywuzzy import fuzz
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import ocr  # noqa: E402
+from wayID import wayID  # noqa: E402
+
+MODES = ("quality", "fast")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", default="testing/dl_images")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 4.0],
+                        help="Upscale factors applied to each sample before preprocessing")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-ocr", action="store_true", help="Skip the OCR text comparison")
+    return parser.parse_args()
+
+
+def run_mode(image, mode, repeat):
+    '''
+    Best-of-`repeat` stage timings and the binary image for one mode
+    '''
+    best = None
+    for _ in range(repeat):
+        way = wayID.from_array(image, preprocess_mode=mode)
+        binary = way._prepare_for_ocr(way.context.gray)
+        if best is None or sum(way.preprocess_timings.values()) < sum(best.values()):
+            best = way.preprocess_timings
+    return best, binary, way
+
+
+def main():
+    args = parse_args()
+    use_ocr = not args.no_ocr
+    if use_ocr:
+        try:
+            ocr.pytesseract.get_tesseract_version()
+        except Exception:
+            print("tesseract not found; skipping OCR comparison")
+            use_ocr = False
+
+    files = sorted(f for f in os.listdir(args.images) if f.lower().endswith(('.png', '.jpg', '.jpeg')))
+    speedups = []
+    for name in files:
+        original = cv2.imread(os.path.join(args.images, name), cv2.IMREAD_COLOR)
+        for scale in args.scales:
+            image = cv2.resize(original, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+            h, w = image.shape[:2]
+            print(f"\n{name} @ {w}x{h} ({w * h / 1e6:.1f} MP)")
+
+            results = {mode: run_mode(image, mode, args.repeat) for mode in MODES}
+            for mode, (timings, binary, _) in results.items():
+                stages = ", ".join(f"{stage} {t * 1000:.1f}ms" for stage, t in timings.items())
+                print(f"  {mode:8s} total {sum(timings.values()) * 1000:8.1f}ms  [{stages}]  -> {binary.shape[1]}x{binary.shape[0]}")
+
+            quality_binary, fast_binary = results["quality"][1], results["fast"][1]
+            resized = cv2.resize(quality_binary, fast_binary.shape[::-1], interpolation=cv2.INTER_NEAREST)
+            agreement = (resized == fast_binary).mean() * 100
+            speedup = sum(results["quality"][0].values()) / sum(results["fast"][0].values())
+            speedups.append(speedup)
+            print(f"  speedup {speedup:.1f}x, binary pixel agreement {agreement:.1f}%")
+
+            if use_ocr:
+                texts = {mode: results[mode][2]._extract_text_from_image(results[mode][1]) for mode in MODES}
+                print(f"  OCR text similarity {fuzz.ratio(texts['quality'], texts['fast'])}%")
+
+    if speedups:
+        print(f"\nMedian speedup over {len(speedups)} runs: {statistics.median(speedups):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
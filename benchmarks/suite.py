@@ -0,0 +1,184 @@
+'''
+End-to-end wayID benchmark on the synthetic corpus, with a saved baseline to compare against.
+
+Every image of benchmarks/corpus.py (each size x JPEG quality) is verified
+`--repeat` times through output(). Per-stage timings come from the
+instrument hook. The report gives throughput, p50/p95/p99 latency for each
+stage and for the whole decode + output() call, and the process's peak RSS.
+--save writes the numbers as JSON, and --compare flags stages whose p50 got
+slower than the given baseline by more than --tolerance (and by at least
+--min-ms, so sub-millisecond stages do not trip on noise).
+
+    python benchmarks/suite.py --save benchmarks/baseline.json
+    python benchmarks/suite.py --compare benchmarks/baseline.json
+'''
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import instrument  # noqa: E402
+import ocr  # noqa: E402
+from corpus import generate  # noqa: E402
+from wayID import wayID  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=4, help="Images per size/quality combination")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 3, 12], help="Capture sizes in megapixels")
+    parser.add_argument("--qualities", type=int, nargs="+", default=[70, 92], help="JPEG qualities")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Verifications per image")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed verifications before measuring")
+    parser.add_argument("--ocr-pool", type=int, default=0, help="Use a warm TesseractPool of this size")
+    parser.add_argument("--save", metavar="PATH", help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed p50 slowdown before a stage counts as a regression (0.10 = 10%%)")
+    parser.add_argument("--min-ms", type=float, default=1.0,
+                        help="Ignore p50 slowdowns smaller than this many milliseconds")
+    return parser.parse_args()
+
+
+def peak_rss_bytes():
+    '''
+    Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)
+    '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summarize(samples):
+    '''
+    Count, mean and percentiles (milliseconds) of a list of durations in seconds
+    '''
+    values = np.asarray(samples) * 1000
+    summary = {"n": len(values), "mean_ms": round(float(values.mean()), 3)}
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f"p{p}_ms"] = round(float(value), 3)
+    return summary
+
+
+def environment():
+    try:
+        tesseract = str(ocr.pytesseract.get_tesseract_version())
+    except Exception:
+        tesseract = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "tesseract": tesseract,
+    }
+
+
+def run(args):
+    corpus = list(generate(args.count, args.sizes, args.qualities, args.seed))
+    stage_samples = {}
+    groups = {}
+    current = []
+
+    def collect(image, timings, peak_memory):
+        current.append(timings)
+
+    if args.ocr_pool:
+        ocr.configure(args.ocr_pool)
+    instrument.add_hook(collect)
+    try:
+        for _, _, _, data, info in corpus[:args.warmup]:
+            wayID.from_bytes(data, **info).output()
+            current.clear()
+
+        started = time.perf_counter()
+        for name, megapixels, quality, data, info in corpus:
+            for _ in range(args.repeat):
+                # from_bytes decodes up front, outside the instrumented verification
+                start = time.perf_counter()
+                way = wayID.from_bytes(data, **info)
+                decoded = time.perf_counter()
+                way.output()
+                elapsed = time.perf_counter() - start
+
+                groups.setdefault(f"{megapixels:g}mp_q{quality}", []).append(elapsed)
+                stage_samples.setdefault("decode", []).append(decoded - start)
+                stage_samples.setdefault("output", []).append(elapsed)
+                for stage, seconds in current.pop().items():
+                    stage_samples.setdefault(stage, []).append(seconds)
+        wall = time.perf_counter() - started
+    finally:
+        instrument.remove_hook(collect)
+
+    verifications = len(corpus) * args.repeat
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment(),
+        "config": {key: getattr(args, key) for key in ("count", "sizes", "qualities", "seed", "repeat", "ocr_pool")},
+        "throughput_per_s": round(verifications / wall, 3),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "stages": {stage: summarize(samples) for stage, samples in sorted(stage_samples.items())},
+        "groups": {group: summarize(samples) for group, samples in groups.items()},
+    }
+
+
+def print_report(results):
+    print(f"throughput {results['throughput_per_s']:.2f} images/s, "
+          f"peak RSS {results['peak_rss_bytes'] / 2**20:.0f} MiB")
+    header = f"{'':32}{'n':>5}" + "".join(f"{f'p{p} ms':>11}" for p in PERCENTILES)
+    for title in ("stages", "groups"):
+        print(f"\n{header.replace(' ' * 32, title.ljust(32), 1)}")
+        for name, summary in results[title].items():
+            print(f"{name:32}{summary['n']:>5}" + "".join(f"{summary[f'p{p}_ms']:>11.1f}" for p in PERCENTILES))
+
+
+def compare(results, baseline, tolerance, min_ms):
+    '''
+    Print the p50 change per stage; returns the stages that got slower than tolerance
+    '''
+    regressions = []
+    print(f"\n{'vs baseline (p50)':32}{'before':>11}{'now':>11}{'change':>9}")
+    for stage, summary in results["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if not before:
+            continue
+        change = summary["p50_ms"] / max(before["p50_ms"], 1e-6) - 1
+        slower_ms = summary["p50_ms"] - before["p50_ms"]
+        flag = "  REGRESSION" if change > tolerance and slower_ms >= min_ms else ""
+        print(f"{stage:32}{before['p50_ms']:>11.1f}{summary['p50_ms']:>11.1f}{change:>+9.0%}{flag}")
+        if flag:
+            regressions.append(stage)
+    if baseline.get("config") != results["config"]:
+        print("note: baseline was recorded with a different corpus/config")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    results = run(args)
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance, args.min_ms):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+'''
+Optional instrumentation for wayID: per-stage timings, peak memory and cProfile.
+
+Every wayID holds a recorder. By default it is NULL_RECORDER, whose stage()
+and timed() do nothing beyond running the wrapped code, so verification pays
+no timing or bookkeeping cost. verify(timings=True), configure(timings=True)
+or a registered hook switches a verification to a StageRecorder, which
+collects time.perf_counter() durations per stage (and optionally the
+tracemalloc peak) and attaches them to the VerificationResult.
+'''
+import cProfile
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+_NULL_STAGE = nullcontext()
+
+# Process-wide defaults used when verify() is not told otherwise
+_config = {"timings": False, "memory": False}
+_hooks = []
+
+# Recorders currently inside measure() with memory=True. tracemalloc and its peak are
+# process-wide: tracing stops when the last of them exits, and none resets the peak
+# while another is running.
+_tracing_lock = threading.Lock()
+_tracing_recorders = set()
+_tracing_started = False
+
+
+class NullRecorder:
+    '''
+    Recorder used when instrumentation is off: runs the code and records nothing
+    '''
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def timed(self, name, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def add(self, name, seconds):
+        pass
+
+
+NULL_RECORDER = NullRecorder()
+
+
+class StageRecorder:
+    '''
+    Wall-clock seconds per named stage; repeated stages accumulate
+    '''
+    enabled = True
+
+    def __init__(self, memory=False):
+        self.timings = {}
+        self.memory = memory
+        self.peak_memory = None
+        # True when another memory-tracked verification overlapped this one
+        self.memory_shared = False
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def timed(self, name, func, *args, **kwargs):
+        with self.stage(name):
+            return func(*args, **kwargs)
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+def configure(timings=False, memory=False):
+    '''
+    Set the process-wide defaults. memory=True also tracks the tracemalloc peak
+    (numpy and Python allocations; OpenCV's own buffers are not seen) and implies timings.
+    '''
+    _config["timings"] = bool(timings or memory)
+    _config["memory"] = bool(memory)
+
+
+def add_hook(hook):
+    '''
+    Call hook(image, timings, peak_memory) after every instrumented verification.
+
+    Registering a hook turns timings on for every verification in this process.
+    Hooks run in the process that did the verification (the worker processes
+    for verify_batch), synchronously, so they should hand off to the metrics
+    sink rather than block. A hook that raises is reported and skipped.
+    '''
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+def recorder(timings=None, memory=None):
+    '''
+    Recorder for one verification; None falls back to configure() and the hooks
+    '''
+    memory = _config["memory"] if memory is None else memory
+    if timings is None:
+        timings = _config["timings"] or bool(_hooks)
+    if not (timings or memory):
+        return NULL_RECORDER
+    return StageRecorder(memory=memory)
+
+
+@contextmanager
+def measure(rec, image=None):
+    '''
+    Time the whole verification as "total", track peak memory, then run the hooks
+    '''
+    if not rec.enabled:
+        yield
+        return
+
+    if rec.memory:
+        _start_tracing(rec)
+    try:
+        with rec.stage("total"):
+            yield
+    finally:
+        if rec.memory:
+            _stop_tracing(rec)
+
+    for hook in list(_hooks):
+        try:
+            hook(image, rec.timings, rec.peak_memory)
+        except Exception:
+            logger.exception("Instrumentation hook %r failed", hook)
+
+
+def _start_tracing(rec):
+    global _tracing_started
+    with _tracing_lock:
+        if not _tracing_recorders:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()  # Someone else's tracing; only the peak is ours
+            else:
+                tracemalloc.start()
+                _tracing_started = True
+        else:
+            rec.memory_shared = True
+            for other in _tracing_recorders:
+                other.memory_shared = True
+        _tracing_recorders.add(rec)
+
+
+def _stop_tracing(rec):
+    '''
+    Record rec's peak: None when verifications overlapped, since the peak cannot be split between them
+    '''
+    global _tracing_started
+    with _tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracing_recorders.discard(rec)
+        if rec.memory_shared:
+            logger.debug("peak_memory not recorded: other memory-tracked verifications ran concurrently")
+        rec.peak_memory = None if rec.memory_shared else peak
+        if not _tracing_recorders and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+def profile_call(func, path=None):
+    '''
+    Run func() under cProfile. Returns (func's result, pstats.Stats), and also
+    writes the raw profile to path (for snakeviz, pstats, ...) when one is given.
+    '''
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(func)
+    finally:
+        if path:
+            profiler.dump_stats(path)
+    return result, pstats.Stats(profiler)
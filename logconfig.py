@@ -0,0 +1,80 @@
+'''
+Logging setup for applications that run wayID (run.py, services, notebooks).
+
+The library modules only create loggers and never add handlers; call
+configure() once at startup to send their records somewhere. With
+async_=True records are put on an in-memory queue by the calling thread and
+written by a background QueueListener thread, so analysis threads never wait
+on stderr or a slow log collector.
+'''
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Handlers added by configure(), so a second call (or a worker process) can replace them
+_installed = []
+_listener = None
+
+
+def configure(level=logging.WARNING, async_=False, stream=None, fmt=DEFAULT_FORMAT):
+    '''
+    Send log records at `level` and above to `stream` (default stderr).
+
+    Replaces whatever a previous configure() installed; handlers added by other
+    code are left alone. Returns the handler attached to the root logger.
+    '''
+    _reset()
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(fmt))
+
+    if async_:
+        global _listener
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        handler = QueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level)
+    _installed.append(handler)
+    return handler
+
+
+def configure_worker(level):
+    '''
+    Logging for a verify_batch worker process.
+
+    A forked worker inherits the parent's handlers, but not the parent's
+    QueueListener thread, so an inherited queue would never be drained. Those
+    are swapped for a direct stderr handler. Handlers the application installed
+    itself are kept as they are.
+    '''
+    root = logging.getLogger()
+    if _installed or not root.handlers:
+        _reset(stop_listener=False)
+        configure(level)
+    else:
+        root.setLevel(level)
+
+
+def _reset(stop_listener=True):
+    '''
+    Remove the handlers configure() installed, flushing the queue if there is one
+    '''
+    global _listener
+    root = logging.getLogger()
+    for handler in _installed:
+        root.removeHandler(handler)
+    _installed.clear()
+    if _listener is not None:
+        if stop_listener:
+            _listener.stop()
+        _listener = None
+
+
+atexit.register(_reset)
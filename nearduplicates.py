@@ -0,0 +1,197 @@
+'''
+Perceptual hashes and a persistent near-duplicate index.
+
+Fake-ID mills reuse one template with small edits. perceptual_hash() reduces
+the rectified card (see ImageContext.canonical) to a 64-bit pHash that barely
+moves under re-encoding, rescaling or a changed text field. NearDuplicateIndex
+keeps every hash it has seen in SQLite and finds earlier ones within a
+Hamming distance without a full scan, using multi-index hashing: the 64 bits
+are split into CHUNKS indexed 16-bit chunks. Two hashes at most max_distance
+apart must agree on at least one chunk to within max_distance // CHUNKS bits,
+so a query looks up only the few buckets near each of its own chunks and
+checks the full distance on those candidates.
+
+A submission is fingerprinted by its image bytes and applicant fields, so
+a client retrying the same request never matches itself. The same image
+sent again with different details does match.
+'''
+import hashlib
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+import cv2
+import numpy as np
+
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+# Matches reported per query, closest first
+MAX_MATCHES = 5
+
+
+def perceptual_hash(gray):
+    '''
+    64-bit pHash of a gray image: the signs of its 8x8 lowest DCT frequencies
+    (from a 32x32 thumbnail) against their median, as an int
+    '''
+    thumbnail = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(thumbnail)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # The DC term only says how bright the card is
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def fingerprint(data, provided_info):
+    '''
+    Hex SHA-256 of one submission: the image bytes (or a contiguous pixel array) plus the applicant fields
+    '''
+    digest = hashlib.sha256(data)
+    digest.update(repr(sorted(provided_info.items())).encode())
+    return digest.hexdigest()
+
+
+def _chunks(value):
+    return [(value >> (CHUNK_BITS * i)) & ((1 << CHUNK_BITS) - 1) for i in range(CHUNKS)]
+
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def _flip_masks(radius):
+    '''
+    Every CHUNK_BITS-bit mask with at most radius bits set
+    '''
+    masks = [0]
+    for count in range(1, radius + 1):
+        for bits in itertools.combinations(range(CHUNK_BITS), count):
+            masks.append(sum(1 << bit for bit in bits))
+    return masks
+
+
+class NearDuplicateIndex:
+    '''
+    Persistent Hamming-distance index of perceptual hashes in SQLite.
+
+    check() finds earlier submissions within max_distance bits of a hash and
+    then records the new one. With stop_distance set, wayID stops verifying
+    an image early when a match is at least that close. The index file can be
+    shared by several processes.
+
+    The cost of a search depends on max_distance // CHUNKS, the radius at which
+    each chunk is searched. Below CHUNKS bits, each chunk is one exact bucket;
+    a search over a million random hashes reads about 60 index entries and
+    takes about 0.1 ms. From CHUNKS to 2 * CHUNKS - 1 bits, each chunk needs
+    17 buckets; that is about 1000 entries and 1-2 ms at a million hashes.
+    '''
+
+    def __init__(self, path=":memory:", max_distance=3, stop_distance=None):
+        self.path = path
+        self.max_distance = max_distance
+        self.stop_distance = stop_distance
+        self._masks = _flip_masks(max_distance // CHUNKS)
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+
+    def settings(self):
+        return {"path": self.path, "max_distance": self.max_distance, "stop_distance": self.stop_distance}
+
+    def _connection(self):
+        # A connection must not be used across fork(); each process opens its own
+        if self._db is None or self._db_pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            chunk_columns = ", ".join(f"c{i} INTEGER" for i in range(CHUNKS))
+            db.execute("CREATE TABLE IF NOT EXISTS hashes (id INTEGER PRIMARY KEY, hash INTEGER, "
+                       f"{chunk_columns}, fingerprint TEXT UNIQUE, label TEXT, added REAL)")
+            # (chunk, hash) indexes answer the candidate scan without touching the table
+            for i in range(CHUNKS):
+                db.execute(f"CREATE INDEX IF NOT EXISTS hashes_c{i} ON hashes (c{i}, hash)")
+            db.commit()
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def search(self, value, exclude=None):
+        '''
+        Earlier submissions within max_distance of value, closest first:
+        [{"id", "distance", "label", "added"}], at most MAX_MATCHES
+        '''
+        queries, params = [], []
+        for i, chunk in enumerate(_chunks(value)):
+            candidates = [chunk ^ mask for mask in self._masks]
+            queries.append(f"SELECT id, hash FROM hashes WHERE c{i} IN ({', '.join('?' * len(candidates))})")
+            params.extend(candidates)
+        unsigned = (1 << HASH_BITS) - 1
+        with self._lock:
+            db = self._connection()
+            # A row can come back once per matching chunk
+            distances = {row_id: ((stored & unsigned) ^ value).bit_count()
+                         for row_id, stored in db.execute(" UNION ALL ".join(queries), params)}
+            close = {row_id: distance for row_id, distance in distances.items() if distance <= self.max_distance}
+            rows = db.execute(f"SELECT id, fingerprint, label, added FROM hashes "
+                              f"WHERE id IN ({', '.join('?' * len(close))})", list(close)).fetchall() if close else []
+
+        matches = [{"id": row_id, "distance": close[row_id], "label": label, "added": added}
+                   for row_id, row_fingerprint, label, added in rows
+                   if exclude is None or row_fingerprint != exclude]
+        matches.sort(key=lambda match: (match["distance"], match["id"]))
+        return matches[:MAX_MATCHES]
+
+    def add(self, value, fingerprint=None, label=None):
+        '''
+        Record a hash; a fingerprint that is already present is not added again
+        '''
+        row = [_signed(value), *_chunks(value), fingerprint, label, time.time()]
+        with self._lock:
+            db = self._connection()
+            with db:
+                db.execute(f"INSERT OR IGNORE INTO hashes (hash, {', '.join(f'c{i}' for i in range(CHUNKS))}, "
+                           f"fingerprint, label, added) VALUES ({', '.join('?' * len(row))})", row)
+
+    def check(self, value, fingerprint=None, label=None):
+        '''
+        search() then add(): the matches among earlier submissions other than this one
+        '''
+        matches = self.search(value, exclude=fingerprint)
+        self.add(value, fingerprint, label)
+        return matches
+
+    def should_stop(self, matches):
+        return self.stop_distance is not None and bool(matches) and matches[0]["distance"] <= self.stop_distance
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._db is not None and self._db_pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+
+_default_index = None
+
+
+def get_default_index():
+    '''
+    Index used by every wayID that was not given one explicitly (None = no near-duplicate check)
+    '''
+    return _default_index
+
+
+def configure(path=None, max_distance=3, stop_distance=None):
+    '''
+    Set the process-wide near-duplicate index; path None turns the check off.
+    Returns the new default index (or None).
+    '''
+    global _default_index
+    index = NearDuplicateIndex(path, max_distance, stop_distance) if path else None
+    previous, _default_index = _default_index, index
+    if previous is not None:
+        previous.close()
+    return index
@@ -0,0 +1,198 @@
+'''
+OCR backends used by wayID.
+
+PytesseractBackend is the original behaviour: every call runs the tesseract
+executable through pytesseract, which starts a new process and reloads the
+language model each time. TesseractPool keeps a fixed number of worker
+processes alive, each holding an initialised tesseract engine (via the
+optional tesserocr package), and sends them images over pipes.
+'''
+import atexit
+import multiprocessing
+import queue
+import threading
+import warnings
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:  # Optional: only needed for TesseractPool
+    tesserocr = None
+
+# Characters that can appear on a US driver's license
+DEFAULT_WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 ,.'()-/"
+
+
+class OCRBackend:
+    '''
+    Interface for anything that can turn a uint8 gray/binary image into text
+    '''
+    # True when a call is cheap enough (no process start-up) to OCR many small crops
+    persistent = False
+
+    def image_to_string(self, image, psm=6, whitelist=DEFAULT_WHITELIST, lang='eng'):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PytesseractBackend(OCRBackend):
+    '''
+    One tesseract process per call through pytesseract (the default fallback)
+    '''
+    def image_to_string(self, image, psm=6, whitelist=DEFAULT_WHITELIST, lang='eng'):
+        custom_config = (
+            '--oem 3 '
+            f'--psm {psm} '
+            f'-c tessedit_char_whitelist="{whitelist}" '
+        )
+        return pytesseract.image_to_string(image, config=custom_config, lang=lang)
+
+
+def _pool_worker(conn, lang):
+    '''
+    Worker process loop: one tesseract engine, loaded once, serving jobs from a pipe
+    '''
+    api = tesserocr.PyTessBaseAPI(lang=lang)
+    try:
+        while True:
+            job = conn.recv()
+            if job is None:
+                break
+            data, shape, psm, whitelist = job
+            try:
+                api.SetPageSegMode(psm)
+                api.SetVariable("tessedit_char_whitelist", whitelist)
+                api.SetImage(Image.fromarray(np.frombuffer(data, np.uint8).reshape(shape)))
+                conn.send((api.GetUTF8Text(), None))
+            except Exception as e:
+                conn.send((None, f"{type(e).__name__}: {e}"))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        api.End()
+
+
+class TesseractPool(OCRBackend):
+    '''
+    A warm pool of persistent tesseract workers.
+
+    Each worker process initialises one engine for `lang` at startup and then
+    serves images sent over its pipe, so per-image cost is recognition only.
+    Safe to share between threads: each call checks out an idle worker and
+    blocks while all `size` workers are busy. A worker that dies is replaced.
+    '''
+    persistent = True
+
+    def __init__(self, size=2, lang='eng'):
+        if tesserocr is None:
+            raise RuntimeError("TesseractPool needs the tesserocr package (pip install tesserocr)")
+        self.size = size
+        self.lang = lang
+        # spawn, not fork: the pool is often created from threaded servers
+        self._mp = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self):
+        parent_conn, child_conn = self._mp.Pipe()
+        process = self._mp.Process(target=_pool_worker, args=(child_conn, self.lang), daemon=True)
+        process.start()
+        child_conn.close()
+        worker = (process, parent_conn)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace_worker(self, worker):
+        process, conn = worker
+        with self._lock:
+            self._workers.remove(worker)
+        conn.close()
+        process.kill()
+        return self._start_worker()
+
+    def image_to_string(self, image, psm=6, whitelist=DEFAULT_WHITELIST, lang='eng'):
+        if lang != self.lang:
+            return PytesseractBackend().image_to_string(image, psm=psm, whitelist=whitelist, lang=lang)
+        if self._closed:
+            raise RuntimeError("TesseractPool is closed")
+
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        worker = self._idle.get()
+        try:
+            worker[1].send((image.tobytes(), image.shape, psm, whitelist))
+            text, error = worker[1].recv()
+        except (EOFError, OSError) as e:
+            worker = self._replace_worker(worker)
+            raise RuntimeError(f"OCR worker died: {e}") from e
+        finally:
+            self._idle.put(worker)
+
+        if error:
+            raise RuntimeError(f"OCR failed: {error}")
+        return text
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for process, conn in workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            conn.close()
+        for process, _ in workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+
+
+_default_backend = PytesseractBackend()
+
+
+def get_default_backend():
+    '''
+    Backend used by every wayID that was not given one explicitly
+    '''
+    return _default_backend
+
+
+def configure(pool_size=0, lang='eng'):
+    '''
+    Set the process-wide default OCR backend.
+
+    pool_size > 0 starts a TesseractPool of that many warm workers; if tesserocr
+    is not installed this falls back to pytesseract with a warning. pool_size 0
+    restores the pytesseract backend. Returns the new default backend.
+    '''
+    global _default_backend
+    backend = PytesseractBackend()
+    if pool_size > 0:
+        if tesserocr is None:
+            warnings.warn("tesserocr is not installed; using one tesseract process per image")
+        else:
+            backend = TesseractPool(pool_size, lang=lang)
+            atexit.register(backend.close)
+
+    previous, _default_backend = _default_backend, backend
+    if previous is not backend:
+        previous.close()
+    return backend
@@ -0,0 +1,180 @@
+'''
+Result objects returned by wayID.verify().
+
+VerificationResult holds plain floats, ints, strings and lists, so in-process
+callers can read the scores directly without formatting or parsing any JSON.
+Serialization is a separate step: to_dict()/to_json() give a compact encoding,
+and to_legacy_dict() rebuilds the layout that wayID.output() has always printed.
+'''
+import json
+from dataclasses import dataclass, field, fields
+
+import numpy as np
+
+# Static guide to the scores; documented once here instead of repeated in every result
+SCORE_INTERPRETATION = {
+    "all_scores": "0-100 (0 = good/authentic, 100 = bad/potentially fraudulent)",
+    "risk_levels": {
+        "Low": "0-49",
+        "Medium": "50-74",
+        "High": "75-100"
+    }
+}
+
+
+def risk_level(fraud_score):
+    '''
+    Map a 0-100 fraud score to Low / Medium / High
+    '''
+    return "High" if fraud_score >= 75 else "Medium" if fraud_score >= 50 else "Low"
+
+
+@dataclass(slots=True)
+class VerificationResult:
+    '''
+    Scores and findings for one verified image (all scores 0-100, higher = more suspicious)
+    '''
+    fraud_score: float
+    text_fraud_score: float
+    image_fraud_score: float
+    metadata_score: float
+    # Weights (0-1) the three component scores were combined with
+    text_weight: float
+    image_weight: float
+    metadata_weight: float
+    metadata_findings: list = field(default_factory=list)
+    # Informational checks, not part of fraud_score
+    card_corners: list = None        # [[x, y]] * 4, TL/TR/BR/BL, or None if no card was found
+    card_confidence: float = 0.0
+    headshot_score: float = 0.0
+    headshot_issues: list = field(default_factory=list)
+    tamper_score: float = 0.0
+    suspicious_blocks: int = 0
+    match_scores: dict = field(default_factory=dict)
+    scoring_factors: list = field(default_factory=list)
+    quality_metrics: dict = field(default_factory=dict)
+    fake_indicators: list = field(default_factory=list)
+    extracted_data: dict = field(default_factory=dict)
+    raw_text: str = ""
+    # Earlier submissions from the near-duplicate index, closest first: [{"id", "distance",
+    # "label", "added"}]; None when no index was checked (see nearduplicates.py)
+    near_duplicates: list = None
+    # Only set when the verification was instrumented (see instrument.py)
+    timings: dict = None             # stage -> seconds
+    peak_memory: int = None          # bytes (tracemalloc peak); None if memory-tracked verifications overlapped
+
+    @property
+    def risk_level(self):
+        return risk_level(self.fraud_score)
+
+    def to_dict(self):
+        '''
+        Flat dict of every field plus risk_level (shares the lists/dicts, no copies)
+        '''
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data["risk_level"] = self.risk_level
+        return data
+
+    def to_json(self):
+        '''
+        Compact single-line JSON encoding of to_dict()
+        '''
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def to_legacy_dict(self):
+        '''
+        The nested, rounded, percent-string layout of wayID.output()
+        '''
+        weights = (self.text_weight, self.image_weight, self.metadata_weight)
+        text_weight, image_weight, metadata_weight = (f"{weight*100}%" for weight in weights)
+        legacy = {
+            "fraud_score": round(self.fraud_score, 1),
+            "risk_level": self.risk_level,
+            "component_scores": {
+                "text_fraud_score": {
+                    "score": round(self.text_fraud_score, 1),
+                    "weight": text_weight
+                },
+                "image_fraud_score": {
+                    "score": round(self.image_fraud_score, 1),
+                    "weight": image_weight
+                },
+                "metadata_analysis": {
+                    "score": round(self.metadata_score, 1),
+                    "findings": self.metadata_findings,
+                    "weight": metadata_weight
+                }
+            },
+            "card_detection": {
+                "corners": self.card_corners,
+                "confidence": round(self.card_confidence, 2)
+            },
+            "headshot_analysis": {
+                "score": round(self.headshot_score, 1),
+                "issues": self.headshot_issues
+            },
+            "tamper_analysis": {
+                "score": round(self.tamper_score, 1),
+                "suspicious_blocks": self.suspicious_blocks
+            },
+            "match_scores": self.match_scores,
+            "scoring_factors": self.scoring_factors,
+            "quality_metrics": {k: f"{v:.1f}%" for k, v in self.quality_metrics.items()},
+            "fake_indicators": self.fake_indicators,
+            "extracted_data": self.extracted_data,
+            "raw_text": self.raw_text,
+            "score_interpretation": {
+                "all_scores": SCORE_INTERPRETATION["all_scores"],
+                "weighting": {
+                    "text_matching": f"{text_weight} of total score",
+                    "image_quality": f"{image_weight} of total score",
+                    "metadata_analysis": f"{metadata_weight} of total score"
+                },
+                "risk_levels": SCORE_INTERPRETATION["risk_levels"]
+            }
+        }
+        if self.near_duplicates is not None:
+            legacy["near_duplicate_analysis"] = {"matches": self.near_duplicates}
+        if self.timings is not None:
+            legacy["instrumentation"] = {
+                "timings_ms": {stage: round(seconds * 1000, 2) for stage, seconds in self.timings.items()},
+                "peak_memory_bytes": self.peak_memory
+            }
+        return legacy
+
+
+@dataclass(slots=True)
+class ImageAnalysis:
+    '''
+    The part of a verification that depends only on the image bytes; what resultcache.py stores
+    '''
+    card_detection: tuple        # (corners or None, confidence), as ImageContext.card_detection
+    quality_metrics: dict
+    image_quality: float
+    fake_indicators: list
+    extracted_text: str
+    extracted_fields: dict
+    metadata_checks: list        # [(points, finding or None)] for EXIF, format and JPEG checks
+    headshot: tuple              # (score, issues)
+    tamper: tuple                # (score, suspicious blocks); the heatmap is not stored
+    perceptual_hash: int = None  # Only computed when a near-duplicate index is in use
+
+    def to_json(self):
+        '''
+        Compact JSON encoding for the SQLite cache tier; numpy values become plain numbers and lists
+        '''
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        return json.dumps(data, separators=(",", ":"), default=lambda value: value.tolist())
+
+    @classmethod
+    def from_json(cls, text):
+        '''
+        Rebuild an entry from to_json(), restoring the corner array and the tuples
+        '''
+        data = json.loads(text)
+        corners, confidence = data["card_detection"]
+        data["card_detection"] = (None if corners is None else np.array(corners), confidence)
+        data["metadata_checks"] = [tuple(check) for check in data["metadata_checks"]]
+        data["headshot"] = tuple(data["headshot"])
+        data["tamper"] = tuple(data["tamper"])
+        return cls(**data)
@@ -0,0 +1,237 @@
+'''
+Content-hash cache for the image-only part of a verification.
+
+Fraudsters and retrying clients resubmit the exact same image bytes. Every
+check that depends only on those bytes is cached under a SHA-256 of the
+image content: card detection, image-quality metrics, OCR text, EXIF/JPEG
+checks, headshot and ELA. A resubmission then runs only the per-request
+part: matching the OCR text against the applicant fields, and the file name
+and timestamp checks. The applicant fields are never part of the key, so the
+same image sent with different details is a hit and is matched against the
+new details.
+
+ResultCache keeps an in-memory LRU tier and, when given a path, a SQLite tier
+that every process opening the same file shares. The SQLite tier stores JSON
+(ImageAnalysis.to_json), never pickles, so a tampered cache file cannot run code. Entries older than ttl
+seconds count as absent. Caching is off unless configure() is called or a
+cache is passed to wayID(result_cache=...).
+'''
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from result import ImageAnalysis
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change to the image analysis makes stored entries stale
+CACHE_VERSION = 6
+
+# Trim expired and least recently used rows from the SQLite tier every this many writes
+DISK_PRUNE_INTERVAL = 100
+
+
+def content_key(data, image=None, **options):
+    '''
+    Hex SHA-256 of the encoded image bytes (or, without them, the decoded
+    pixels) plus the options that change the analysis, e.g. the OCR mode
+    '''
+    digest = hashlib.sha256()
+    if data is not None:
+        digest.update(data)
+    else:
+        digest.update(f"{image.shape}{image.dtype}".encode())
+        digest.update(image.data)
+    digest.update(repr((CACHE_VERSION, sorted(options.items()))).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    '''
+    LRU + TTL cache of ImageAnalysis entries, in memory and optionally in SQLite.
+
+    max_entries bounds the memory tier (0 = no memory tier); max_disk_entries
+    bounds the SQLite file at path. ttl is in seconds (None = never expire).
+    stats counts hits (memory_hits + disk_hits), misses, stores, evictions and
+    expired entries for this process. Disk errors are logged and count as misses,
+    so a broken cache file never fails a verification. Cached entries are shared:
+    callers must copy them before changing anything.
+    '''
+
+    def __init__(self, max_entries=256, ttl=None, path=None, max_disk_entries=100_000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.stats = Counter()
+        self._entries = OrderedDict()   # key -> (stored at, entry), least recently used first
+        # Guards the memory tier and the counters only; SQLite calls run outside it
+        # on one connection per thread, so threads do not queue behind each other's disk IO
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []          # (pid, connection) for every thread, for close()
+        self._disk_writes = 0
+
+    def settings(self):
+        '''
+        Constructor arguments, e.g. to build the same cache in worker processes
+        '''
+        return {"max_entries": self.max_entries, "ttl": self.ttl, "path": self.path,
+                "max_disk_entries": self.max_disk_entries}
+
+    def get(self, key):
+        '''
+        The entry stored under key, or None
+        '''
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if self._fresh(item[0], now):
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return item[1]
+                del self._entries[key]
+                self.stats["expired"] += 1
+
+        item = self._disk_get(key, now) if self.path else None
+        with self._lock:
+            if item is not None:
+                self._remember(key, *item)
+                self.stats["hits"] += 1
+                self.stats["disk_hits"] += 1
+                return item[1]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, entry):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, entry)
+            self.stats["stores"] += 1
+            self._disk_writes += 1
+            prune = self._disk_writes % DISK_PRUNE_INTERVAL == 0
+        if self.path:
+            self._disk_put(key, now, entry, prune)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            self._disk_execute("DELETE FROM analyses")
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for pid, db in connections:
+            if pid == os.getpid():
+                db.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _fresh(self, stored, now):
+        return self.ttl is None or now - stored < self.ttl
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _remember(self, key, stored, entry):
+        # Callers hold self._lock
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (stored, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _connection(self):
+        # One connection per thread; a connection must not be used across fork() either
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS analyses "
+                       "(key TEXT PRIMARY KEY, stored REAL, used REAL, value TEXT)")
+            db.execute("CREATE INDEX IF NOT EXISTS analyses_used ON analyses (used)")
+            db.commit()
+            local.db, local.pid = db, os.getpid()
+            with self._lock:
+                self._connections.append((local.pid, db))
+        return local.db
+
+    def _disk_execute(self, sql, *params):
+        try:
+            db = self._connection()
+            with db:
+                return db.execute(sql, params).fetchone()
+        except sqlite3.Error as e:
+            self._count("disk_errors")
+            logger.warning("Result cache %s: %s", self.path, e)
+            return None
+
+    def _disk_get(self, key, now):
+        row = self._disk_execute("SELECT stored, value FROM analyses WHERE key = ?", key)
+        if row is None:
+            return None
+        stored, value = row
+        if not self._fresh(stored, now):
+            self._disk_execute("DELETE FROM analyses WHERE key = ?", key)
+            self._count("expired")
+            return None
+        try:
+            entry = ImageAnalysis.from_json(value)
+        except Exception as e:
+            # Written by an incompatible version of the code
+            logger.warning("Dropping unreadable result cache entry %s: %s", key, e)
+            self._disk_execute("DELETE FROM analyses WHERE key = ?", key)
+            return None
+        self._disk_execute("UPDATE analyses SET used = ? WHERE key = ?", now, key)
+        return stored, entry
+
+    def _disk_put(self, key, now, entry, prune=False):
+        value = entry.to_json()
+        self._disk_execute("INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?)", key, now, now, value)
+        if prune:
+            if self.ttl is not None:
+                self._disk_execute("DELETE FROM analyses WHERE stored <= ?", now - self.ttl)
+            self._disk_execute("DELETE FROM analyses WHERE key IN "
+                               "(SELECT key FROM analyses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                               self.max_disk_entries)
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    '''
+    Cache used by every wayID that was not given one explicitly (None = no caching)
+    '''
+    return _default_cache
+
+
+def configure(max_entries=0, ttl=None, path=None, max_disk_entries=100_000):
+    '''
+    Set the process-wide result cache.
+
+    max_entries > 0 keeps that many analyses in memory; path adds a SQLite
+    file shared between processes. With neither, caching is turned off.
+    Returns the new default cache (or None).
+    '''
+    global _default_cache
+    cache = None
+    if max_entries > 0 or path:
+        cache = ResultCache(max_entries, ttl=ttl, path=path, max_disk_entries=max_disk_entries)
+
+    previous, _default_cache = _default_cache, cache
+    if previous is not None:
+        previous.close()
+    return cache
@@ -1,59 +1,236 @@
-print("Starting...")
-from wayID import wayID
-import os
+import argparse
+import collections
 import json
-import cv2
-
-# Read user information from input.json
-try:
-    with open("testing/input.json", "r") as f:
-        user_info = json.load(f)
-except FileNotFoundError:
-    print("Error: input.json file not found")
-    exit(1)
-except json.JSONDecodeError:
-    print("Error: input.json is not valid JSON")
-    exit(1)
-
-# Get all image files from the dl_images directory
-image_dir = "testing/dl_images"
-image_files = [f for f in os.listdir(image_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-
-# Process each image
-for image_file in image_files:
-    print("\nRunning wayID on: ", image_file)
-    print("--------------------------------")
-    
-    # Get user information for this image from the JSON file
-    image_info = user_info.get(image_file)
-    
-    if not image_info:
-        print(f"Warning: No information found for {image_file} in input.json")
-        continue
-    
-    # Extract required fields with error checking
-    required_fields = ['first_name', 'last_name', 'street_address', 'date_of_birth']
-    missing_fields = [field for field in required_fields if field not in image_info]
-    
-    if missing_fields:
-        print(f"Error: Missing required fields for {image_file}: {', '.join(missing_fields)}")
-        continue
-    
-    image_path = os.path.join(image_dir, image_file)
-    print(f"\nProcessing: {image_path}")
-    print(f"Using information from input.json for {image_file}")
-    
-    myWay = wayID(
-        image_path=image_path,
-        first_name=image_info.get('first_name'),
-        last_name=image_info.get('last_name'),
-        street_address=image_info.get('street_address'),
-        street_city=image_info.get('street_city'),
-        street_state=image_info.get('street_state'),
-        street_zip=image_info.get('street_zip'),
-        date_of_birth=image_info.get('date_of_birth')
-    )
-    myJson = myWay.output()
-    print(myJson)
-
-print("\nDone")
\ No newline at end of file
+import logging
+import os
+import sys
+
+import logconfig
+from wayID import wayID
+
+logger = logging.getLogger("run")
+
+REQUIRED_FIELDS = ['first_name', 'last_name', 'street_address', 'date_of_birth']
+APPLICANT_FIELDS = ['first_name', 'last_name', 'street_address', 'street_city',
+                    'street_state', 'street_zip', 'date_of_birth']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run wayID over a folder of driver's license images")
+    parser.add_argument("--input", default="testing/input.json",
+                        help="JSON file of applicant information keyed by image filename")
+    parser.add_argument("--images", default="testing/dl_images",
+                        help="Directory containing the license images")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes, also used when 1 (0 = one per CPU core)")
+    parser.add_argument("--ocr-pool", type=int, default=0,
+                        help="Warm tesseract engines per worker process (needs tesserocr; 0 = one tesseract process per image)")
+    parser.add_argument("--unordered", action="store_true",
+                        help="Print results as soon as each image finishes instead of in input order")
+    parser.add_argument("--log-level", default="WARNING",
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Diagnostics written to stderr; DEBUG adds one structured record per image")
+    parser.add_argument("--log-async", action="store_true",
+                        help="Write log records from a background thread instead of the analysis threads")
+    parser.add_argument("--timings", action="store_true",
+                        help="Attach per-stage timings to every result")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="Image analyses each worker keeps in memory for repeated images (0 = none)")
+    parser.add_argument("--cache-db", metavar="PATH",
+                        help="SQLite file of cached image analyses, shared by the workers and later runs")
+    parser.add_argument("--cache-ttl", type=float, default=None,
+                        help="Seconds a cached analysis stays valid (default: no expiry)")
+    parser.add_argument("--dup-index", metavar="PATH",
+                        help="SQLite near-duplicate index: report earlier submissions with a similar card")
+    parser.add_argument("--dup-distance", type=int, default=3,
+                        help="Perceptual-hash bits (of 64) two cards may differ by to count as near-duplicates")
+    parser.add_argument("--dup-stop", type=int, default=None,
+                        help="Skip the remaining checks when a near-duplicate is at most this many bits away")
+    parser.add_argument("--jsonl", metavar="MANIFEST",
+                        help="Stream a JSONL manifest (one {\"image\": ..., <applicant fields>} object per line) "
+                             "instead of reading --input")
+    parser.add_argument("--output", default="-",
+                        help="Where --jsonl mode writes one compact JSON result per line (default: stdout)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted --jsonl run after the last record already in --output")
+    args = parser.parse_args()
+    if args.jsonl and args.unordered:
+        parser.error("--jsonl results are always written in manifest order (needed for --resume)")
+    if args.resume and (not args.jsonl or args.output == "-"):
+        parser.error("--resume needs --jsonl and an --output file")
+    return args
+
+
+def cache_settings(args):
+    '''
+    resultcache.configure() arguments for the workers, or None when caching is off
+    '''
+    if not (args.cache_size or args.cache_db):
+        return None
+    return {"max_entries": args.cache_size, "ttl": args.cache_ttl, "path": args.cache_db}
+
+
+def duplicate_settings(args):
+    '''
+    nearduplicates.configure() arguments for the workers, or None when there is no index
+    '''
+    if not args.dup_index:
+        return None
+    return {"path": args.dup_index, "max_distance": args.dup_distance, "stop_distance": args.dup_stop}
+
+
+def build_manifest(user_info, image_dir):
+    '''
+    Yield (image_path, info) for every image that has complete information in input.json
+    '''
+    image_files = [f for f in os.listdir(image_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+
+    for image_file in image_files:
+        # Get user information for this image from the JSON file
+        image_info = user_info.get(image_file)
+
+        if not image_info:
+            logger.warning("No information found for %s in input.json", image_file)
+            continue
+
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in image_info]
+        if missing_fields:
+            logger.error("Missing required fields for %s: %s", image_file, ", ".join(missing_fields))
+            continue
+
+        info = {field: image_info.get(field) for field in APPLICANT_FIELDS}
+        yield os.path.join(image_dir, image_file), info
+
+
+def read_jsonl_manifest(path, image_dir, start=1, records=None):
+    '''
+    Lazily yield (image_path, info) for each valid line of a JSONL manifest.
+
+    Lines before line number `start` are skipped without being parsed. The line
+    number of every yielded record is appended to `records` so the caller can
+    label results that come back in the same order. Invalid lines are reported
+    and skipped.
+    '''
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if line_number < start or not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.error("%s:%d is not valid JSON (%s)", path, line_number, e)
+                continue
+            if not isinstance(record, dict) or not record.get("image"):
+                logger.error("%s:%d has no \"image\"", path, line_number)
+                continue
+
+            missing_fields = [field for field in REQUIRED_FIELDS if field not in record]
+            if missing_fields:
+                logger.error("Missing required fields for %s:%d: %s", path, line_number, ", ".join(missing_fields))
+                continue
+
+            if records is not None:
+                records.append(line_number)
+            info = {field: record.get(field) for field in APPLICANT_FIELDS}
+            yield os.path.join(image_dir, record["image"]), info
+
+
+def resume_point(output_path):
+    '''
+    Manifest line number to restart from, given the results written so far.
+
+    Only the tail of the file is read. A partly written last line (the process
+    died mid-write) is truncated away so the file stays valid JSONL.
+    '''
+    if not os.path.exists(output_path):
+        return 1
+    with open(output_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        tail = b""
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            tail = f.read(end - start) + tail
+            end = start
+            # Need the last newline plus the newline before it (or the file start)
+            if tail.count(b"\n") >= 2 or (end == 0 and b"\n" in tail):
+                break
+        if not tail.endswith(b"\n"):
+            keep = tail.rfind(b"\n") + 1
+            f.truncate(end + keep)
+            tail = tail[:keep]
+        lines = tail.splitlines()
+    if not lines:
+        return 1
+    return json.loads(lines[-1])["record"] + 1
+
+
+def run_jsonl(args):
+    '''
+    Stream --jsonl through verify_batch, writing and flushing one result line per record
+    '''
+    start = resume_point(args.output) if args.resume else 1
+    if start > 1:
+        logger.info("Resuming %s from line %d", args.jsonl, start)
+
+    # Line numbers of submitted records; bounded by verify_batch's max_pending
+    records = collections.deque()
+    manifest = read_jsonl_manifest(args.jsonl, args.images, start, records)
+    results = wayID.verify_batch(manifest, workers=args.workers or None, ordered=True,
+                                 ocr_pool_size=args.ocr_pool, structured=True, timings=args.timings,
+                                 cache=cache_settings(args), duplicates=duplicate_settings(args))
+
+    out = sys.stdout if args.output == "-" else open(args.output, "a" if args.resume else "w")
+    try:
+        for image_path, output, error in results:
+            line = {
+                "record": records.popleft(),
+                "image": image_path,
+                "result": output.to_dict() if output else None,
+                "error": error,
+            }
+            out.write(json.dumps(line, separators=(",", ":")) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def main():
+    args = parse_args()
+    logconfig.configure(args.log_level, async_=args.log_async)
+    if args.jsonl:
+        run_jsonl(args)
+        return
+
+    logger.info("Starting...")
+
+    # Read user information from input.json
+    try:
+        with open(args.input, "r") as f:
+            user_info = json.load(f)
+    except FileNotFoundError:
+        logger.error("%s file not found", args.input)
+        sys.exit(1)
+    except json.JSONDecodeError:
+        logger.error("%s is not valid JSON", args.input)
+        sys.exit(1)
+
+    manifest = build_manifest(user_info, args.images)
+    results = wayID.verify_batch(manifest, workers=args.workers or None, ordered=not args.unordered,
+                                 ocr_pool_size=args.ocr_pool, timings=args.timings,
+                                 cache=cache_settings(args), duplicates=duplicate_settings(args))
+
+    for image_path, output, error in results:
+        print("\nwayID result for: ", image_path)
+        print("--------------------------------")
+        if error:
+            print(f"Error: {error}")
+        else:
+            print(output)
+
+    logger.info("Done")
+
+
+if __name__ == "__main__":
+    main()
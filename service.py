@@ -0,0 +1,251 @@
+'''
+Long-running HTTP verification service.
+
+    python service.py --port 8000 --workers 4 --queue 8 --timeout 30
+
+POST /verify takes a multipart form: the license image in the "image" field
+and the applicant fields (first_name, last_name, street_address,
+date_of_birth, and optionally street_city, street_state, street_zip) as form
+fields. It responds with the output() JSON. GET /health reports pool state.
+
+Images are verified in a pool of worker processes that are started and
+warmed up (OCR backend, face cascade) before the first request. At most
+workers + queue requests are accepted at once; beyond that the service
+answers 429 with Retry-After instead of queueing without bound. A request
+that is not answered within the timeout gets 504. Its job still holds a slot
+until the worker finishes it, because a running job cannot be interrupted,
+so the 429 limit always reflects the real load on the workers.
+'''
+import argparse
+import logging
+import multiprocessing
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import Flask, Response, jsonify, request
+
+import logconfig
+from run import APPLICANT_FIELDS, REQUIRED_FIELDS, cache_settings, duplicate_settings
+from wayID import wayID, _init_worker, _stage_threads_per_worker
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _verify_upload(data, info):
+    '''
+    Worker-process entry point: verify one uploaded image and return output()
+
+    Errors are re-raised as plain ValueError (bad input, answered with 422) or
+    RuntimeError. The exception is pickled back to the server, and one that
+    cannot be unpickled (e.g. pytesseract.TesseractNotFoundError) would break
+    the whole pool.
+    '''
+    try:
+        return wayID.from_bytes(data, **info).output()
+    except ValueError as e:
+        raise ValueError(str(e)) from None
+    except Exception as e:
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+
+
+def _ready():
+    return os.getpid()
+
+
+class VerificationService:
+    '''
+    A warm process pool with a fixed number of admission slots.
+
+    submit() takes a slot or raises QueueFull. The slot is given back when the
+    job finishes (or is cancelled before it starts), not when the caller stops
+    waiting.
+    '''
+
+    def __init__(self, workers=None, max_queue=None, timeout=30.0, ocr_pool_size=0, cache=None, duplicates=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * 2 if max_queue is None else max_queue
+        self.timeout = timeout
+        self.ocr_pool_size = ocr_pool_size
+        # resultcache.configure() arguments for every worker, or None
+        self.cache = cache
+        # nearduplicates.configure() arguments for every worker, or None
+        self.duplicates = duplicates
+        self.capacity = self.workers + self.max_queue
+        self.stats = Counter()
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._start_pool()
+
+    def _start_pool(self):
+        # spawn, not fork: the pool is (re)started from a threaded server
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_worker,
+                                   initargs=(self.ocr_pool_size, False, False,
+                                             logging.getLogger().getEffectiveLevel(),
+                                             _stage_threads_per_worker(self.workers), self.cache,
+                                             self.duplicates))
+        # One task per worker makes the executor start all of them now, and waiting for
+        # the answers means every worker has run its initializer before we take traffic
+        pids = {future.result() for future in [pool.submit(_ready) for _ in range(self.workers)]}
+        logger.info("Started %d verification workers (pids %s)", len(pids), sorted(pids))
+        self._pool = pool
+
+    def _restart_pool(self, broken):
+        with self._lock:
+            if self._pool is not broken:
+                return  # Another request already replaced it
+            logger.error("Verification worker pool broke; restarting it")
+            self.stats["pool_restarts"] += 1
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._start_pool()
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+
+    def submit(self, data, info):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.stats["rejected"] += 1
+                raise QueueFull()
+            self.in_flight += 1
+            self.stats["accepted"] += 1
+            pool = self._pool
+        try:
+            future = pool.submit(_verify_upload, data, info)
+        except BrokenProcessPool:
+            self._release(None)
+            self._restart_pool(pool)
+            raise
+        future.add_done_callback(self._release)
+        future.pool = pool
+        return future
+
+    def result(self, future, timeout=None):
+        '''
+        Wait for a submitted job; TimeoutError if it is not done within timeout
+        '''
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            self.stats["timeouts"] += 1
+            future.cancel()  # Frees the slot now if the job has not started yet
+            raise
+        except BrokenProcessPool:
+            self._restart_pool(future.pool)
+            raise
+
+    def health(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self.in_flight,
+                "timeout": self.timeout,
+                "stats": dict(self.stats),
+            }
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _error(status, message, **headers):
+    response = jsonify(error=message)
+    response.status_code = status
+    response.headers.update(headers)
+    return response
+
+
+def create_app(service):
+    '''
+    Flask app serving /verify and /health from a VerificationService
+    '''
+    app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+    @app.post("/verify")
+    def verify():
+        upload = request.files.get("image")
+        if upload is None:
+            return _error(400, "multipart field 'image' is required")
+        info = {field: request.form[field] for field in APPLICANT_FIELDS if request.form.get(field)}
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in info]
+        if missing_fields:
+            return _error(400, f"Missing required fields: {', '.join(missing_fields)}")
+
+        try:
+            future = service.submit(upload.read(), info)
+        except QueueFull:
+            return _error(429, "Too many requests in progress", **{"Retry-After": "1"})
+        except BrokenProcessPool:
+            return _error(503, "Verification workers are restarting", **{"Retry-After": "1"})
+
+        try:
+            output = service.result(future)
+        except TimeoutError:
+            return _error(504, f"Verification did not finish within {service.timeout:g}s")
+        except BrokenProcessPool:
+            return _error(503, "Verification worker crashed", **{"Retry-After": "1"})
+        except ValueError as e:
+            # Undecodable image or invalid input
+            return _error(422, str(e))
+        except Exception as e:
+            logger.exception("Verification failed")
+            return _error(500, f"{type(e).__name__}: {e}")
+        return Response(output, mimetype="application/json")
+
+    @app.get("/health")
+    def health():
+        return jsonify(service.health())
+
+    return app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="wayID verification service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (0 = one per CPU core)")
+    parser.add_argument("--queue", type=int, default=None,
+                        help="Requests allowed to wait for a worker before answering 429 (default 2 x workers)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds before a request gets 504")
+    parser.add_argument("--ocr-pool", type=int, default=0,
+                        help="Warm tesseract engines per worker process (needs tesserocr)")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="Image analyses each worker keeps in memory for resubmitted images (0 = none)")
+    parser.add_argument("--cache-db", metavar="PATH", help="SQLite file of cached image analyses shared by the workers")
+    parser.add_argument("--cache-ttl", type=float, default=None, help="Seconds a cached analysis stays valid")
+    parser.add_argument("--dup-index", metavar="PATH", help="SQLite near-duplicate index shared by the workers")
+    parser.add_argument("--dup-distance", type=int, default=3,
+                        help="Perceptual-hash bits (of 64) two cards may differ by to count as near-duplicates")
+    parser.add_argument("--dup-stop", type=int, default=None,
+                        help="Skip the remaining checks when a near-duplicate is at most this many bits away")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logconfig.configure(args.log_level, async_=True)
+    service = VerificationService(workers=args.workers or None, max_queue=args.queue,
+                                  timeout=args.timeout, ocr_pool_size=args.ocr_pool, cache=cache_settings(args),
+                                  duplicates=duplicate_settings(args))
+    try:
+        # One thread per connection; the admission slots, not the server, bound the work
+        create_app(service).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
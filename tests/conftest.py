@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root rather than in a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import ocr  # noqa: E402
+
+
+class FixedTextBackend(ocr.OCRBackend):
+    '''
+    Stands in for tesseract: every call reads the same license text
+    '''
+    def image_to_string(self, image, psm=6, whitelist=ocr.DEFAULT_WHITELIST, lang='eng'):
+        return "CALIFORNIA DRIVER LICENSE\nDL 123456789\nSMITH, JOHN\n1 MAIN ST\nDOB 01/01/1990\nEXP 01/01/2030"
+
+
+@pytest.fixture
+def fixed_ocr():
+    return FixedTextBackend()
@@ -0,0 +1,37 @@
+import os
+
+import wayID as wayid_module
+from wayID import wayID
+
+
+def _crashing_job(job):
+    # Stands in for _verify_job: "crash.jpg" takes its worker process down like a native segfault
+    index, image_path, info, structured = job
+    if image_path == "crash.jpg":
+        os._exit(1)
+    return index, image_path, f"ok {image_path}", None
+
+
+def test_worker_crash_fails_only_the_crashing_image(monkeypatch):
+    monkeypatch.setattr(wayid_module, "_verify_job", _crashing_job)
+    manifest = [(f"{i}.jpg", {}) for i in range(6)] + [("crash.jpg", {})] + [(f"{i}.jpg", {}) for i in range(6, 12)]
+
+    results = list(wayID.verify_batch(manifest, workers=2))
+
+    assert [image_path for image_path, _, _ in results] == [image_path for image_path, _ in manifest]
+    for image_path, output, error in results:
+        if image_path == "crash.jpg":
+            assert output is None
+            assert error.startswith("BrokenProcessPool")
+        else:
+            assert (output, error) == (f"ok {image_path}", None)
+
+
+def test_worker_crash_unordered_reports_every_image(monkeypatch):
+    monkeypatch.setattr(wayid_module, "_verify_job", _crashing_job)
+    manifest = [("crash.jpg", {})] + [(f"{i}.jpg", {}) for i in range(8)]
+
+    results = list(wayID.verify_batch(manifest, workers=3, ordered=False, max_pending=3))
+
+    assert sorted(image_path for image_path, _, _ in results) == sorted(image_path for image_path, _ in manifest)
+    assert [image_path for image_path, _, error in results if error] == ["crash.jpg"]
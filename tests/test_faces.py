@@ -0,0 +1,40 @@
+import threading
+
+import numpy as np
+
+import wayID as wayid_module
+
+
+def test_each_thread_gets_its_own_face_cascade():
+    cascades = {}
+
+    def load(name):
+        cascades[name] = wayid_module._load_face_cascade()
+
+    threads = [threading.Thread(target=load, args=(name,)) for name in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(cascade) for cascade in cascades.values()}) == 3
+    assert wayid_module._load_face_cascade() is wayid_module._load_face_cascade()
+
+
+def test_concurrent_detection_matches_sequential():
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 255, (240, 320), dtype=np.uint8) for _ in range(4)]
+    expected = [np.asarray(wayid_module._detect_with_cascade(image, (20, 20), (200, 200))).tolist()
+                for image in images]
+    results = [None] * len(images)
+
+    def detect(index):
+        results[index] = np.asarray(wayid_module._detect_with_cascade(images[index], (20, 20), (200, 200))).tolist()
+
+    threads = [threading.Thread(target=detect, args=(index,)) for index in range(len(images))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == expected
@@ -0,0 +1,27 @@
+import io
+
+import pytest
+
+from wayID import ImageContext, wayID
+
+
+@pytest.mark.parametrize("data", [b"", bytearray()])
+def test_empty_bytes_raise_value_error(data):
+    with pytest.raises(ValueError, match="could not decode image"):
+        ImageContext.from_bytes(data)
+    with pytest.raises(ValueError, match="could not decode image"):
+        wayID.from_bytes(data)
+
+
+@pytest.mark.parametrize("data", [b"not an image at all" * 8, b"\xff\xd8\xff\xe0"])
+def test_undecodable_bytes_raise_value_error_on_first_use(data, fixed_ocr):
+    # Decoding is deferred so that result cache hits skip it
+    with pytest.raises(ValueError, match="could not decode image"):
+        ImageContext.from_bytes(data).image
+    with pytest.raises(ValueError, match="could not decode image"):
+        wayID.from_bytes(data, ocr_backend=fixed_ocr).verify()
+
+
+def test_empty_file_object_raises_value_error():
+    with pytest.raises(ValueError, match="could not decode image"):
+        wayID.from_file(io.BytesIO(b""))
@@ -0,0 +1,44 @@
+import tracemalloc
+
+import pytest
+
+import instrument
+import wayID as wayid_module
+from corpus import render
+from wayID import wayID
+
+
+@pytest.fixture
+def stage_threads():
+    previous = wayid_module._stage_threads
+    wayid_module.configure_stage_threads(4)
+    yield
+    wayid_module.configure_stage_threads(previous)
+
+
+def test_profile_sees_the_analyzers_with_stage_threads(stage_threads, fixed_ocr):
+    data, info = render(0, 1, 85)
+    way = wayID.from_bytes(data, ocr_backend=fixed_ocr, **info)
+    way.verify(profile=True)
+
+    profiled = {function for _, _, function in way.profile_stats.stats}
+    assert "_preprocess_image" in profiled
+    assert "_extract_text_from_image" in profiled
+
+
+def test_overlapping_memory_measurements_keep_tracing_and_are_not_misattributed():
+    first, second = instrument.StageRecorder(memory=True), instrument.StageRecorder(memory=True)
+    with instrument.measure(first):
+        with instrument.measure(second):
+            block = bytearray(8 * 1024 * 1024)
+        # The second one finishing must not stop tracing under the first
+        assert tracemalloc.is_tracing()
+        del block
+    assert not tracemalloc.is_tracing()
+    assert first.peak_memory is None and second.peak_memory is None
+
+    alone = instrument.StageRecorder(memory=True)
+    with instrument.measure(alone):
+        block = bytearray(8 * 1024 * 1024)
+    assert alone.peak_memory >= 8 * 1024 * 1024
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,16 @@
+import json
+
+from corpus import render
+from wayID import wayID
+
+
+def test_verification_result_holds_plain_floats(fixed_ocr):
+    data, info = render(0, 1, 85)
+    result = wayID.from_bytes(data, ocr_backend=fixed_ocr, **info).verify()
+
+    assert type(result.fraud_score) is float
+    assert type(result.image_fraud_score) is float
+    for name in ("text_fraud_score", "metadata_score", "card_confidence", "headshot_score", "tamper_score"):
+        assert type(getattr(result, name)) is float, name
+    assert all(type(value) is float for value in result.quality_metrics.values())
+    assert json.loads(result.to_json())["fraud_score"] == result.fraud_score
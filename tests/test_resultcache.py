@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+
+from corpus import render
+from result import ImageAnalysis
+from resultcache import ResultCache
+from wayID import wayID
+
+
+def _analysis(thread, i):
+    return ImageAnalysis(
+        card_detection=(np.array([[0.0, 0.0], [85.6, 0.0], [85.6, 54.0], [0.0, 54.0]]) * (i + 1), np.float64(0.9)),
+        quality_metrics={"blur_score": np.float64(thread)}, image_quality=i, fake_indicators=["x"],
+        extracted_text=f"{thread}-{i}", extracted_fields={"dl_number": "D123"},
+        metadata_checks=[(10, "No EXIF metadata"), (-5, None)], headshot=(30, ["issue"]), tamper=(1.5, 2),
+        perceptual_hash=2**63 + i)
+
+
+def _same(a, b):
+    return (np.array_equal(a.card_detection[0], b.card_detection[0])
+            and a.card_detection[1] == b.card_detection[1]
+            and (a.quality_metrics, a.image_quality, a.fake_indicators, a.extracted_text, a.extracted_fields,
+                 a.metadata_checks, a.headshot, a.tamper, a.perceptual_hash)
+            == (b.quality_metrics, b.image_quality, b.fake_indicators, b.extracted_text, b.extracted_fields,
+                b.metadata_checks, b.headshot, b.tamper, b.perceptual_hash))
+
+
+def test_disk_tier_is_shared_across_threads_and_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResultCache(max_entries=0, path=path)
+    errors = []
+
+    def worker(thread):
+        try:
+            for i in range(20):
+                key = f"{thread}-{i}"
+                cache.put(key, _analysis(thread, i))
+                assert _same(cache.get(key), _analysis(thread, i))
+        except Exception as e:  # Surfaced in the main thread below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(thread,)) for thread in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache.close()
+
+    assert errors == []
+    assert cache.stats["disk_hits"] == 160
+    assert cache.stats["disk_errors"] == 0
+
+    reopened = ResultCache(max_entries=4, path=path)
+    entry = reopened.get("7-19")
+    assert _same(entry, _analysis(7, 19))
+    assert isinstance(entry.card_detection[0], np.ndarray)
+    assert type(entry.headshot) is tuple and type(entry.tamper) is tuple
+    assert reopened.get("7-19") is entry
+    assert reopened.get("missing") is None
+    assert (reopened.stats["disk_hits"], reopened.stats["memory_hits"], reopened.stats["misses"]) == (1, 1, 1)
+    reopened.close()
+
+
+def test_cache_hit_never_decodes_the_image(tmp_path, fixed_ocr):
+    data, _ = render(seed=3, megapixels=1, quality=85)
+    cache = ResultCache(max_entries=0, path=str(tmp_path / "cache.sqlite"))
+    first = wayID.from_bytes(data, ocr_backend=fixed_ocr, result_cache=cache)
+    expected = first.verify()
+    assert "image" in vars(first.context)
+
+    second = wayID.from_bytes(data, ocr_backend=fixed_ocr, result_cache=cache)
+    assert second.verify() == expected
+    assert cache.stats["disk_hits"] == 1
+    assert "image" not in vars(second.context)
+    cache.close()
@@ -0,0 +1,72 @@
+import io
+import pickle
+from concurrent.futures import Future
+
+import pytest
+
+import service
+
+
+class _UnpicklableError(Exception):
+    # Like pytesseract.TesseractNotFoundError: __init__ takes no message, so unpickling fails
+    def __init__(self):
+        super().__init__("tesseract is not installed")
+
+
+def _raise(error):
+    def from_bytes(data, **info):
+        raise error
+    return from_bytes
+
+
+def _roundtrip(error):
+    return pickle.loads(pickle.dumps(error))
+
+
+def test_worker_errors_cross_the_process_boundary(monkeypatch):
+    with pytest.raises(TypeError):
+        _roundtrip(_UnpicklableError())
+
+    monkeypatch.setattr(service.wayID, "from_bytes", _raise(_UnpicklableError()))
+    with pytest.raises(RuntimeError) as info:
+        service._verify_upload(b"data", {})
+    error = _roundtrip(info.value)
+    assert type(error) is RuntimeError
+    assert str(error) == "_UnpicklableError: tesseract is not installed"
+
+
+def test_worker_value_errors_stay_value_errors(monkeypatch):
+    monkeypatch.setattr(service.wayID, "from_bytes", _raise(ValueError("could not decode image")))
+    with pytest.raises(ValueError) as info:
+        service._verify_upload(b"data", {})
+    assert type(_roundtrip(info.value)) is ValueError
+
+
+class _InlineService:
+    '''
+    Runs uploads in this process with the worker entry point, in place of the process pool
+    '''
+    timeout = 30.0
+
+    def submit(self, data, info):
+        future = Future()
+        try:
+            future.set_result(service._verify_upload(data, info))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def result(self, future, timeout=None):
+        return future.result()
+
+
+@pytest.mark.parametrize("data", [b"", b"garbage bytes, not a JPEG"])
+def test_undecodable_upload_is_rejected_with_422(data):
+    client = service.create_app(_InlineService()).test_client()
+    form = {"first_name": "JOHN", "last_name": "SMITH", "street_address": "1 MAIN ST",
+            "date_of_birth": "01/01/1990", "image": (io.BytesIO(data), "card.jpg")}
+
+    response = client.post("/verify", data=form, content_type="multipart/form-data")
+
+    assert response.status_code == 422
+    assert response.get_json() == {"error": "could not decode image"}
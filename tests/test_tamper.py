@@ -0,0 +1,70 @@
+import io
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+import wayID as wayid_module
+from corpus import render, resave, splice
+from wayID import wayID
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_resaved_card_scores_low_and_spliced_card_high(seed):
+    capture, _ = render(seed, 3, 70)
+    spliced, _ = splice(seed, 3, 70, 98)
+
+    clean_score, _ = wayID.from_bytes(resave(capture, 98))._check_card_tampering()
+    spliced_score, _ = wayID.from_bytes(spliced)._check_card_tampering()
+
+    assert clean_score < 20
+    assert spliced_score > 60
+
+
+def test_clean_capture_does_not_saturate():
+    data, _ = render(2, 3, 70)
+    score, _ = wayID.from_bytes(data)._check_card_tampering()
+    assert score < 20
+
+
+def test_same_card_scores_the_same_on_different_backgrounds(monkeypatch):
+    # A zero baseline and unit scale make the score the raw peak, so it never clips
+    monkeypatch.setattr(wayid_module, "ELA_PEAK_BASELINE", 0.0)
+    monkeypatch.setattr(wayid_module, "ELA_SCORE_SCALE", 1.0)
+    rng = np.random.default_rng(7)
+    plain = np.full((300, 400, 3), (60, 70, 80), np.uint8)
+    # Wood-grain-like desk: lots of texture for the JPEG encoder and the textured-block median
+    grain = cv2.GaussianBlur(rng.normal(0, 40, (300, 400)).astype(np.float32), (0, 0), sigmaX=12, sigmaY=1)
+    wood = np.clip(np.stack([grain + 90, grain + 120, grain + 150], axis=2) + rng.normal(0, 8, (300, 400, 3)),
+                   0, 255).astype(np.uint8)
+
+    peaks = []
+    for desk in (plain, wood):
+        data, _ = splice(0, 3, 70, 98, desk=desk)
+        way = wayID.from_bytes(data)
+        assert way.context.card_detection[0] is not None
+        peak, _ = way._check_card_tampering()
+        peaks.append(peak)
+
+    assert peaks[0] == pytest.approx(peaks[1], rel=0.05)
+
+
+def test_tamper_check_returns_only_score_and_block_count():
+    # This tuple is what the result cache stores, so it must not carry the heatmap
+    data, _ = splice(0, 3, 70, 98)
+    way = wayID.from_bytes(data)
+    score, blocks = way._check_card_tampering()
+    assert type(score) is float and type(blocks) is int
+    assert blocks > 0
+    assert way.tamper_heatmap is not None
+
+
+@pytest.mark.parametrize("quality, export_quality", [(70, None), (85, None), (92, None), (70, 92), (92, 98)])
+def test_double_compression_separates_single_saves_from_resaves(quality, export_quality):
+    data, _ = render(1, 1, quality)
+    if export_quality is not None:
+        data = resave(data, export_quality)
+    way = wayID.from_bytes(data)
+    score = way._detect_double_compression(Image.open(io.BytesIO(data)), way.context)
+    assert (score > wayid_module.DOUBLE_COMPRESSION_THRESHOLD) == (export_quality is not None)
@@ -1,5 +1,4 @@
 import cv2
-import pytesseract
 from PIL import Image
 import re
 from collections import Counter
@@ -10,10 +9,794 @@ from PIL.ExifTags import TAGS
 import time
 import os
 import io
+import logging
+from types import MappingProxyType
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import instrument
+import logconfig
+import nearduplicates
+import ocr
+import resultcache
+from result import ImageAnalysis, VerificationResult
+
+logger = logging.getLogger(__name__)
+
+# Shared lookup tables. These are built once at import time and only ever read,
+# so every wayID instance (and every thread) uses the same objects.
+
+# Enhanced patterns for better name matching
+PATTERNS = MappingProxyType({
+    "state_header": re.compile(r"(NEW YORK|CALIFORNIA|TEXAS|FLORIDA|etc)\s+STATE", re.IGNORECASE),
+    "name": (
+        # Multiple name patterns to try
+        re.compile(r"([A-Z'-]+)[,.\s]+([A-Z'-]+(?:\s+[A-Z'-]+)*)", re.MULTILINE),  # Last, First
+        re.compile(r"([A-Z'-]+(?:\s+[A-Z'-]+)*)\s+([A-Z'-]+)", re.MULTILINE),      # First Last
+        re.compile(r"([A-Z'-]+)[,.\s]*\n\s*([A-Z'-]+)", re.MULTILINE),             # Split by newline
+    ),
+    "date_of_birth": (
+        re.compile(r"DOB[,.\s:]+(\d{2}/\d{2}/\d{4})"),
+        re.compile(r"(\d{2}/\d{2}/\d{4})")  # Fallback to any date format
+    ),
+    "license_number": re.compile(r"[A-Z0-9]\s*(\d{3}\s*\d{3}\s*\d{3})\s*[A-Z0-9]"),
+    "address": (
+        re.compile(r"(\d+\s+[A-Z0-9\s]+(?:ST|AVE|RD|BLVD|APT).+?\d{5})"),
+        re.compile(r"(\d+[A-Z0-9\s,]+\d{5})")  # More permissive address pattern
+    ),
+    "expiration": re.compile(r"(?:EXP|EXPIRES?)[,.\s:]+(\d{2}/\d{2}/\d{4})"),
+    "issue_date": re.compile(r"(?:ISS|ISSUED)[,.\s:]+(\d{2}/\d{2}/\d{4})"),
+    "class": re.compile(r"CLASS[,.\s:]*([A-Z])")
+})
+
+# State-specific validation rules
+_STATE_RULE_TABLE = {
+    "AL": {
+        "license_format": r"[0-9]{7}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["350", "351", "352", "353", "354", "355", "356", "357", "358", "359", "360", "361", "362", "363", "364", "365", "366", "367", "368", "369"]
+    },
+    "AK": {
+        "license_format": r"[0-9]{7}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["995", "996", "997", "998", "999"]
+    },
+    "AZ": {
+        "license_format": r"[A-Z][0-9]{8}",
+        "valid_classes": ["A", "B", "C", "D", "G", "M"],
+        "zip_prefix": ["850", "851", "852", "853", "854", "855", "856", "857", "858", "859", "860", "861", "862", "863", "864", "865"]
+    },
+    "AR": {
+        "license_format": r"[0-9]{4,9}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["716", "717", "718", "719", "720", "721", "722", "723", "724", "725", "726", "727", "728", "729"]
+    },
+    "CA": {
+        "license_format": r"[A-Z][0-9]{7}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["900", "901", "902", "903", "904", "905", "906", "907", "908", "909", "910", "911", "912", "913", "914", "915", "916", "917", "918", "919", "920", "921", "922", "923", "924", "925", "926", "927", "928", "929", "930", "931", "932", "933", "934", "935", "936", "937", "938", "939", "940", "941", "942", "943", "944", "945", "946", "947", "948", "949", "950", "951", "952", "953", "954", "955", "956", "957", "958", "959", "960", "961"]
+    },
+    "CO": {
+        "license_format": r"[0-9]{9}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["800", "801", "802", "803", "804", "805", "806", "807", "808", "809", "810", "811", "812", "813", "814", "815", "816"]
+    },
+    "CT": {
+        "license_format": r"[0-9]{9}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["060", "061", "062", "063", "064", "065", "066", "067", "068", "069"]
+    },
+    "DE": {
+        "license_format": r"[0-9]{1,7}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["197", "198", "199"]
+    },
+    "FL": {
+        "license_format": r"[A-Z][0-9]{12}",
+        "valid_classes": ["A", "B", "C", "D", "E", "M"],
+        "zip_prefix": ["320", "321", "322", "323", "324", "325", "326", "327", "328", "329", "330", "331", "332", "333", "334", "335", "336", "337", "338", "339", "340", "341", "342", "343", "344", "345", "346", "347", "348", "349"]
+    },
+    "GA": {
+        "license_format": r"[0-9]{7,9}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["300", "301", "302", "303", "304", "305", "306", "307", "308", "309", "310", "311", "312", "313", "314", "315", "316", "317", "318", "319", "398", "399"]
+    },
+    "HI": {
+        "license_format": r"[A-Z][0-9]{8}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["967", "968"]
+    },
+    "ID": {
+        "license_format": r"[A-Z]{2}[0-9]{6}[A-Z]",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["832", "833", "834", "835", "836", "837", "838"]
+    },
+    "IL": {
+        "license_format": r"[A-Z][0-9]{11,12}",
+        "valid_classes": ["A", "B", "C", "D", "L", "M"],
+        "zip_prefix": ["600", "601", "602", "603", "604", "605", "606", "607", "608", "609", "610", "611", "612", "613", "614", "615", "616", "617", "618", "619", "620", "621", "622", "623", "624", "625", "626", "627", "628", "629"]
+    },
+    "IN": {
+        "license_format": r"[0-9]{9,10}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["460", "461", "462", "463", "464", "465", "466", "467", "468", "469", "470", "471", "472", "473", "474", "475", "476", "477", "478", "479"]
+    },
+    "IA": {
+        "license_format": r"[0-9]{9}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["500", "501", "502", "503", "504", "505", "506", "507", "508", "509", "510", "511", "512", "513", "514", "515", "516", "517", "518", "519", "520", "521", "522", "523", "524", "525", "526", "527", "528"]
+    },
+    "KS": {
+        "license_format": r"[A-Z][0-9]{2}-[0-9]{2}-[0-9]{4}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["660", "661", "662", "663", "664", "665", "666", "667", "668", "669", "670", "671", "672", "673", "674", "675", "676", "677", "678", "679"]
+    },
+    "KY": {
+        "license_format": r"[A-Z][0-9]{8,9}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["400", "401", "402", "403", "404", "405", "406", "407", "408", "409", "410", "411", "412", "413", "414", "415", "416", "417", "418", "419", "420", "421", "422", "423", "424", "425", "426", "427"]
+    },
+    "LA": {
+        "license_format": r"[0-9]{1,9}",
+        "valid_classes": ["A", "B", "C", "D", "E", "M"],
+        "zip_prefix": ["700", "701", "702", "703", "704", "705", "706", "707", "708", "709", "710", "711", "712", "713", "714"]
+    },
+    "ME": {
+        "license_format": r"[0-9]{7}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["039", "040", "041", "042", "043", "044", "045", "046", "047", "048", "049"]
+    },
+    "MD": {
+        "license_format": r"[A-Z][0-9]{12}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["206", "207", "208", "209", "210", "211", "212", "213", "214", "215", "216", "217", "218", "219"]
+    },
+    "MA": {
+        "license_format": r"S[0-9]{8}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["010", "011", "012", "013", "014", "015", "016", "017", "018", "019", "020", "021", "022", "023", "024", "025", "026", "027"]
+    },
+    "MI": {
+        "license_format": r"[A-Z][0-9]{12}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["480", "481", "482", "483", "484", "485", "486", "487", "488", "489", "490", "491", "492", "493", "494", "495", "496", "497", "498", "499"]
+    },
+    "MN": {
+        "license_format": r"[A-Z][0-9]{12}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["550", "551", "552", "553", "554", "555", "556", "557", "558", "559", "560", "561", "562", "563", "564", "565", "566", "567"]
+    },
+    "MS": {
+        "license_format": r"[0-9]{9}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["386", "387", "388", "389", "390", "391", "392", "393", "394", "395", "396", "397"]
+    },
+    "MO": {
+        "license_format": r"[A-Z][0-9]{5,9}",
+        "valid_classes": ["A", "B", "C", "D", "E", "F", "M"],
+        "zip_prefix": ["630", "631", "632", "633", "634", "635", "636", "637", "638", "639", "640", "641", "642", "643", "644", "645", "646", "647", "648", "649", "650", "651", "652", "653", "654", "655", "656", "657", "658"]
+    },
+    "MT": {
+        "license_format": r"[A-Z][0-9]{8}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["590", "591", "592", "593", "594", "595", "596", "597", "598", "599"]
+    },
+    "NE": {
+        "license_format": r"[A-Z][0-9]{6,8}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["680", "681", "682", "683", "684", "685", "686", "687", "688", "689", "690", "691", "692", "693"]
+    },
+    "NV": {
+        "license_format": r"[0-9]{9,10}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["889", "890", "891", "892", "893", "894", "895", "896", "897", "898"]
+    },
+    "NH": {
+        "license_format": r"[0-9]{2}[A-Z]{3}[0-9]{5}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["030", "031", "032", "033", "034", "035", "036", "037", "038"]
+    },
+    "NJ": {
+        "license_format": r"[A-Z][0-9]{14}",
+        "valid_classes": ["A", "B", "C", "D", "E", "M"],
+        "zip_prefix": ["070", "071", "072", "073", "074", "075", "076", "077", "078", "079", "080", "081", "082", "083", "084", "085", "086", "087", "088", "089"]
+    },
+    "NM": {
+        "license_format": r"[0-9]{9}",
+        "valid_classes": ["A", "B", "C", "D", "E", "M"],
+        "zip_prefix": ["870", "871", "872", "873", "874", "875", "876", "877", "878", "879", "880", "881", "882", "883", "884"]
+    },
+    "NY": {
+        "license_format": r"\d{3}\s?\d{3}\s?\d{3}",
+        "valid_classes": ["A", "B", "C", "D", "E", "M"],
+        "zip_prefix": ["100", "101", "102", "103", "104", "105", "106", "107", "108", "109", "110", "111", "112", "113", "114", "115", "116", "117", "118", "119", "120", "121", "122", "123", "124", "125", "126", "127", "128", "129", "130", "131", "132", "133", "134", "135", "136", "137", "138", "139", "140", "141", "142", "143", "144", "145", "146", "147", "148", "149"]
+    },
+    "NC": {
+        "license_format": r"[0-9]{12}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["270", "271", "272", "273", "274", "275", "276", "277", "278", "279", "280", "281", "282", "283", "284", "285", "286", "287", "288", "289"]
+    },
+    "ND": {
+        "license_format": r"[A-Z]{3}-[0-9]{2}-[0-9]{4}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["580", "581", "582", "583", "584", "585", "586", "587", "588"]
+    },
+    "OH": {
+        "license_format": r"[A-Z][0-9]{7}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["430", "431", "432", "433", "434", "435", "436", "437", "438", "439", "440", "441", "442", "443", "444", "445", "446", "447", "448", "449", "450", "451", "452", "453", "454", "455", "456", "457", "458"]
+    },
+    "OK": {
+        "license_format": r"[A-Z][0-9]{9}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["730", "731", "732", "733", "734", "735", "736", "737", "738", "739", "740", "741", "742", "743", "744", "745", "746", "747", "748", "749"]
+    },
+    "OR": {
+        "license_format": r"[0-9]{1,9}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["970", "971", "972", "973", "974", "975", "976", "977", "978", "979"]
+    },
+    "PA": {
+        "license_format": r"[0-9]{8}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["150", "151", "152", "153", "154", "155", "156", "157", "158", "159", "160", "161", "162", "163", "164", "165", "166", "167", "168", "169", "170", "171", "172", "173", "174", "175", "176", "177", "178", "179", "180", "181", "182", "183", "184", "185", "186", "187", "188", "189", "190", "191", "192", "193", "194", "195", "196"]
+    },
+    "RI": {
+        "license_format": r"[0-9]{7}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["028", "029"]
+    },
+    "SC": {
+        "license_format": r"[0-9]{5,11}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["290", "291", "292", "293", "294", "295", "296", "297", "298", "299"]
+    },
+    "SD": {
+        "license_format": r"[0-9]{6,10}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["570", "571", "572", "573", "574", "575", "576", "577"]
+    },
+    "TN": {
+        "license_format": r"[0-9]{7,9}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["370", "371", "372", "373", "374", "375", "376", "377", "378", "379", "380", "381", "382", "383", "384", "385"]
+    },
+    "TX": {
+        "license_format": r"[0-9]{7,8}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["750", "751", "752", "753", "754", "755", "756", "757", "758", "759", "760", "761", "762", "763", "764", "765", "766", "767", "768", "769", "770", "771", "772", "773", "774", "775", "776", "777", "778", "779", "780", "781", "782", "783", "784", "785", "786", "787", "788", "789", "790", "791", "792", "793", "794", "795", "796", "797", "798", "799"]
+    },
+    "UT": {
+        "license_format": r"[0-9]{4,10}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["840", "841", "842", "843", "844", "845", "846", "847"]
+    },
+    "VT": {
+        "license_format": r"[0-9]{8}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["050", "051", "052", "053", "054", "055", "056", "057", "058", "059"]
+    },
+    "VA": {
+        "license_format": r"[A-Z][0-9]{8,11}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["201", "220", "221", "222", "223", "224", "225", "226", "227", "228", "229", "230", "231", "232", "233", "234", "235", "236", "237", "238", "239", "240", "241", "242", "243", "244", "245"]
+    },
+    "WA": {
+        "license_format": r"[A-Z]{7}[0-9]{3}[A-Z]{2}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["980", "981", "982", "983", "984", "985", "986", "987", "988", "989", "990", "991", "992", "993", "994"]
+    },
+    "WV": {
+        "license_format": r"[A-Z][0-9]{6}",
+        "valid_classes": ["A", "B", "C", "D", "E", "F", "M"],
+        "zip_prefix": ["247", "248", "249", "250", "251", "252", "253", "254", "255", "256", "257", "258", "259", "260", "261", "262", "263", "264", "265", "266", "267", "268"]
+    },
+    "WI": {
+        "license_format": r"[A-Z][0-9]{13}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["530", "531", "532", "533", "534", "535", "536", "537", "538", "539", "540", "541", "542", "543", "544", "545", "546", "547", "548", "549"]
+    },
+    "WY": {
+        "license_format": r"[0-9]{9,10}",
+        "valid_classes": ["A", "B", "C", "M"],
+        "zip_prefix": ["820", "821", "822", "823", "824", "825", "826", "827", "828", "829", "830", "831"]
+    },
+    "DC": {
+        "license_format": r"[0-9]{7}",
+        "valid_classes": ["A", "B", "C", "D", "M"],
+        "zip_prefix": ["200", "202", "203", "204", "205"]
+    }
+}
+
+# Read-only view of the table above with ZIP prefixes and classes as frozensets,
+# so the per-request checks are constant-time set lookups
+STATE_RULES = MappingProxyType({
+    state: MappingProxyType({
+        "license_format": rules["license_format"],
+        "valid_classes": frozenset(rules["valid_classes"]),
+        "zip_prefix": frozenset(rules["zip_prefix"])
+    })
+    for state, rules in _STATE_RULE_TABLE.items()
+})
+del _STATE_RULE_TABLE
+
+REQUIRED_FIELDS = frozenset({'name', 'date_of_birth', 'license_number', 'address', 'expiration'})
+
+# Region OCR: page segmentation mode and character whitelist per field.
+# "line" is the first pass over every detected text segment; a segment that is
+# classified as one of the other fields but does not parse is re-read with that
+# field's narrower whitelist.
+FIELD_OCR = MappingProxyType({
+    "line": (7, ocr.DEFAULT_WHITELIST),
+    "name": (7, "ABCDEFGHIJKLMNOPQRSTUVWXYZ ,.'-"),
+    "date_of_birth": (7, "DOB0123456789/ :"),
+    "expiration": (7, "EXPIRS0123456789/ :"),
+    "license_number": (7, "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 -"),
+    "address": (7, ocr.DEFAULT_WHITELIST)
+})
+
+# What a correctly read value of each field looks like
+FIELD_VALUE_PATTERNS = MappingProxyType({
+    "name": re.compile(r"^[A-Z][A-Z ,.'-]+$"),
+    "date_of_birth": re.compile(r"\d{2}/\d{2}/\d{4}"),
+    "expiration": re.compile(r"\d{2}/\d{2}/\d{4}"),
+    "license_number": re.compile(r"[A-Z0-9]*\d{4,}[A-Z0-9-]*"),
+    "address": re.compile(r"\d+\s+[A-Z0-9]")
+})
+
+# Card furniture that looks like a name line but never is one
+HEADER_WORDS = frozenset({
+    "DRIVER", "DRIVERS", "LICENSE", "LICENCE", "IDENTIFICATION", "CARD", "STATE",
+    "CLASS", "USA", "REAL", "ID", "ORGAN", "DONOR", "VETERAN", "RESTRICTIONS", "ENDORSEMENTS",
+    "SEX", "HGT", "WGT", "EYES", "HAIR"
+})
+
+MAX_OCR_REGIONS = 64
+
+# Fast OCR preprocessing resamples the card to this resolution before filtering.
+# A CR-80 card (the standard license size) is 3.370 x 2.125 inches.
+CARD_WIDTH_INCHES = 3.370
+OCR_TARGET_DPI = 300
+
+# Image metrics run on the card resampled to this size: a CR-80 card at 300 DPI
+CARD_HEIGHT_INCHES = 2.125
+CANONICAL_DPI = 300
+CANONICAL_CARD_SIZE = (round(CARD_WIDTH_INCHES * CANONICAL_DPI), round(CARD_HEIGHT_INCHES * CANONICAL_DPI))
+
+# Card outline search: edge map long side, the smallest card area (as a fraction
+# of the frame) and the lowest confidence accepted as a detection
+CARD_DETECT_SIDE = 640
+CARD_MIN_AREA_RATIO = 0.08
+CARD_MIN_CONFIDENCE = 0.3
+
+# Spectral analysis runs on the gray plane shrunk to this long side; microprint
+# and guilloche statistics are stable well below full phone resolution
+SPECTRUM_MAX_SIDE = 1024
+SPECTRUM_WINDOW = False
+SPECTRUM_RADIAL_BINS = 32
+
+# Headshot detection: the portrait sits in the left part of the card and covers
+# roughly 8-35% of it (_validate_headshot flags outside that range). The search
+# window is a little wider so out-of-range faces are still found and reported.
+HEADSHOT_REGION_WIDTH = 0.55
+HEADSHOT_DETECT_HEIGHT = 240
+HEADSHOT_FACE_RATIO = (0.04, 0.45)
+
+# libjpeg (IJG) reference quantization tables in natural (row-major) order, the
+# order PIL uses for img.quantization. Quality q scales them by 5000/q below 50
+# and by 200-2q from 50 up.
+IJG_LUMINANCE_TABLE = (
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99
+)
+IJG_CHROMINANCE_TABLE = (
+    17, 18, 24, 47, 99, 99, 99, 99,
+    18, 21, 26, 66, 99, 99, 99, 99,
+    24, 26, 56, 99, 99, 99, 99, 99,
+    47, 66, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99,
+    99, 99, 99, 99, 99, 99, 99, 99
+)
+
+
+def _ijg_tables_by_quality(table):
+    '''
+    (100, 64) array: row q-1 is `table` as libjpeg scales it for quality q
+    '''
+    quality = np.arange(1, 101)[:, None]
+    scale = np.where(quality < 50, 5000 // quality, 200 - 2 * quality)
+    return np.clip((np.asarray(table)[None, :] * scale + 50) // 100, 1, 255).astype(np.int32)
+
+
+_IJG_LUMINANCE_BY_QUALITY = _ijg_tables_by_quality(IJG_LUMINANCE_TABLE)
+_IJG_CHROMINANCE_BY_QUALITY = _ijg_tables_by_quality(IJG_CHROMINANCE_TABLE)
+
+# Orthonormal 8x8 DCT-II matrix: coefficients = D @ block @ D.T
+_DCT_MATRIX = np.array([
+    [np.sqrt((1 if k == 0 else 2) / 8) * np.cos((2 * n + 1) * k * np.pi / 16) for n in range(8)]
+    for k in range(8)
+], dtype=np.float32)
+
+# Low-frequency AC coefficients (first nine in zigzag order) used for the
+# double-compression check, and the score above which it is reported. On the
+# synthetic corpus (1/3/12 MP) single saves at q70-98 score 0.06-0.38 and saves
+# re-compressed at a different, higher quality 0.93-1.53; the threshold sits
+# between the two. A re-save at the same quality cannot be told apart (0.20-0.38)
+DOUBLE_COMPRESSION_COEFFICIENTS = ((0, 1), (1, 0), (2, 0), (1, 1), (0, 2), (0, 3), (1, 2), (2, 1), (3, 0))
+DOUBLE_COMPRESSION_THRESHOLD = 0.65
+
+# Error-level analysis: re-save quality and block size (pixels)
+ELA_QUALITY = 95
+ELA_BLOCK = 16
+# Blocks with a gray-level std above this carry content and form the reference level
+ELA_TEXTURED_STD = 8
+# Calibrated with benchmarks/ela_benchmark.py --calibrate on the synthetic corpus: the
+# 99th-percentile block of a clean or re-saved capture is 2-6x the textured median,
+# of one with a fresh photo pasted in 7-22x at 3 MP and above. The score ramps from
+# 0 at ELA_PEAK_BASELINE to 100 at 9x; blocks above ELA_SUSPICIOUS_LEVEL are counted
+ELA_PEAK_BASELINE = 5.0
+ELA_SCORE_SCALE = 25.0
+ELA_SUSPICIOUS_LEVEL = 6.0
+
+# Palette quantization for cartoon detection: value -> round(value / 32)
+_PALETTE_LEVELS = np.round(np.arange(256) / 32).astype(np.uint8)
+
+# Window sizes for the multi-scale local variance in texture analysis
+TEXTURE_SCALES = (3, 7, 15)
+
+
+# Words that only appear on sample, specimen or training cards
+TEXT_FAKE_INDICATORS = (
+    "SAMPLE", "SPECIMEN", "NOT FOR IDENTIFICATION", "VOID",
+    "NON-VALID", "INVALID", "TEST", "DEMO", "EXAMPLE",
+    "NOT A VALID", "NOT VALID", "TRAINING", "PRACTICE"
+)
+
+
+class _cached_plane:
+    '''
+    functools.cached_property without its lock.
+
+    Before Python 3.12 that lock belongs to the descriptor, not the instance, so
+    while one thread computes one image's card, threads working on unrelated
+    images wait for it. Here two threads racing on the same instance may both
+    compute the value; they get identical results and the last one is kept.
+    '''
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        # Non-data descriptor: once stored, the instance attribute is found first
+        value = instance.__dict__[self.name] = self.func(instance)
+        return value
+
+
+class ImageContext:
+    '''
+    A single decoded image shared by every analyzer.
+
+    The file is read once and decoded on first access to image, so a result
+    cache hit never decodes; grayscale, HSV and YCrCb planes, Sobel gradients
+    and the spectrum are computed on first use and cached, so analyzers that
+    need the same plane never convert or transform it twice.
+    '''
+    def __init__(self, image=None, data=None, path=None, stat=None):
+        if image is not None:
+            self.image = image    # BGR, uint8; otherwise decoded from data on first use
+        self.data = data          # Encoded file bytes, for PIL metadata analysis
+        self.path = path
+        self.stat = stat
+        self._gradients = {}
+
+    @classmethod
+    def from_bytes(cls, data):
+        '''
+        Decode an encoded image (JPEG, PNG, ...) held in memory
+        '''
+        data = bytes(data)
+        if not data:
+            raise ValueError("could not decode image")
+        return cls(data=data)
+
+    @classmethod
+    def from_file(cls, fileobj):
+        '''
+        Decode an image from a binary file-like object, e.g. an upload stream
+        '''
+        return cls.from_bytes(fileobj.read())
+
+    @classmethod
+    def from_array(cls, image):
+        '''
+        Wrap an already-decoded image: BGR, BGRA or single-channel gray, uint8
+        '''
+        image = np.asarray(image)
+        if image.dtype != np.uint8:
+            raise ValueError(f"Expected a uint8 image array, got {image.dtype}")
+        if image.ndim == 2:
+            image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        elif image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        elif image.ndim != 3 or image.shape[2] != 3:
+            raise ValueError(f"Unsupported image array shape {image.shape}")
+        return cls(np.ascontiguousarray(image))
+
+    @classmethod
+    def from_path(cls, path):
+        '''
+        Read the file once: the same bytes feed the OpenCV decode and PIL
+        '''
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        return cls(data=data, path=path, stat=stat)
+
+    @staticmethod
+    def _decode(data):
+        '''
+        BGR image from encoded bytes; ValueError for empty or undecodable data
+        '''
+        # imdecode raises cv2.error rather than returning None on an empty buffer
+        if not len(data):
+            raise ValueError("could not decode image")
+        try:
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        except cv2.error:
+            image = None
+        if image is None:
+            raise ValueError("could not decode image")
+        return image
+
+    @_cached_plane
+    def image(self):
+        return self._decode(self.data)
+
+    @property
+    def height(self):
+        return self.image.shape[0]
+
+    @property
+    def width(self):
+        return self.image.shape[1]
+
+    def open_pil(self):
+        '''
+        PIL view of the original encoded bytes (format, EXIF, quantization tables)
+        '''
+        return Image.open(io.BytesIO(self.data))
+
+    @_cached_plane
+    def gray(self):
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    @_cached_plane
+    def hsv(self):
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2HSV)
+
+    @_cached_plane
+    def ycrcb(self):
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2YCrCb)
+
+    @_cached_plane
+    def hue(self):
+        return self.hsv[:, :, 0]
+
+    def sobel(self, plane, dx, dy):
+        '''
+        3x3 Sobel derivative of the named plane ("gray" or "hue").
+        float32 is exact here: uint8 input keeps every 3x3 response an integer.
+        '''
+        key = (plane, dx, dy)
+        if key not in self._gradients:
+            self._gradients[key] = cv2.Sobel(getattr(self, plane), cv2.CV_32F, dx, dy, ksize=3)
+        return self._gradients[key]
+
+    @_cached_plane
+    def card_detection(self):
+        '''
+        (corners, confidence) of the card in the frame; corners are None when no
+        outline is found or it is less certain than CARD_MIN_CONFIDENCE
+        '''
+        corners, confidence = _locate_card(self.gray)
+        if corners is None or confidence < CARD_MIN_CONFIDENCE:
+            return None, confidence
+        return corners, confidence
+
+    @_cached_plane
+    def card(self):
+        '''
+        The card cropped and rectified with a perspective warp, at (roughly) the
+        capture's own resolution and the CR-80 aspect ratio. This context itself
+        when no card was located.
+        '''
+        quad, _ = self.card_detection
+        if quad is None:
+            return self
+        width = int(round(max(np.linalg.norm(quad[1] - quad[0]), np.linalg.norm(quad[2] - quad[3]))))
+        height = int(round(width * CARD_HEIGHT_INCHES / CARD_WIDTH_INCHES))
+        destination = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+        transform = cv2.getPerspectiveTransform(quad.astype(np.float32), destination)
+        warped = cv2.warpPerspective(self.image, transform, (width, height),
+                                     flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        return ImageContext(warped)
+
+    @_cached_plane
+    def canonical(self):
+        '''
+        The rectified card resampled to CANONICAL_CARD_SIZE for the image metrics
+        '''
+        card = self.card
+        target_w, target_h = CANONICAL_CARD_SIZE
+        interpolation = cv2.INTER_AREA if card.width > target_w else cv2.INTER_CUBIC
+        return ImageContext(cv2.resize(card.image, (target_w, target_h), interpolation=interpolation))
+
+    @_cached_plane
+    def spectrum(self):
+        '''
+        Spectral features of the gray plane, shared by the microprint and security analyzers
+        '''
+        return SpectralFeatures(self.gray)
+
+
+def _load_planes(card):
+    '''
+    Compute the color planes every image metric reads, so parallel metrics do not race to build them
+    '''
+    card.gray, card.hsv, card.ycrcb
+    return card
+
+
+def _order_corners(points):
+    '''
+    Order four points as top-left, top-right, bottom-right, bottom-left with the
+    long side on top, so a card photographed in portrait comes out landscape
+    '''
+    points = np.asarray(points, dtype=np.float32).reshape(4, 2)
+    center = points.mean(axis=0)
+    angles = np.arctan2(points[:, 1] - center[1], points[:, 0] - center[0])
+    ordered = points[np.argsort(angles)]  # Clockwise in image coordinates, starting top-left-ish
+    start = np.argmin(ordered.sum(axis=1))
+    ordered = np.roll(ordered, -start, axis=0)
+    if np.linalg.norm(ordered[1] - ordered[0]) < np.linalg.norm(ordered[3] - ordered[0]):
+        ordered = np.roll(ordered, -1, axis=0)
+    return ordered
+
+
+def _card_confidence(contour_area, quad):
+    '''
+    How card-like a quadrilateral is: how well the contour fills it, times how
+    close its aspect ratio is to a CR-80 card (1.586)
+    '''
+    quad_area = cv2.contourArea(quad.astype(np.float32))
+    if quad_area <= 0:
+        return 0.0
+    fill = min(1.0, contour_area / quad_area)
+    width = (np.linalg.norm(quad[1] - quad[0]) + np.linalg.norm(quad[2] - quad[3])) / 2
+    height = (np.linalg.norm(quad[3] - quad[0]) + np.linalg.norm(quad[2] - quad[1])) / 2
+    if height <= 0:
+        return 0.0
+    aspect_error = abs(np.log((width / height) / (CARD_WIDTH_INCHES / CARD_HEIGHT_INCHES)))
+    return float(fill * np.exp(-3 * aspect_error))
+
+
+def _locate_card(gray):
+    '''
+    Find the card in the frame.
+
+    The largest external contours of a downscaled edge map are simplified
+    with approxPolyDP; a convex four-corner outline gives the true perspective
+    quad. Otherwise the largest contour's rotated minimum-area rectangle is used,
+    with its confidence discounted. Returns (corners, confidence) where corners
+    are ordered TL, TR, BR, BL in full-resolution coordinates, or (None, 0.0)
+    when nothing card-sized is found (e.g. the card already fills the frame).
+    '''
+    height, width = gray.shape[:2]
+    scale = min(1.0, CARD_DETECT_SIDE / max(height, width))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    
+    edges = cv2.Canny(cv2.GaussianBlur(small, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None, 0.0
+    
+    frame_area = small.shape[0] * small.shape[1]
+    contours = sorted(contours, key=cv2.contourArea, reverse=True)[:5]
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < CARD_MIN_AREA_RATIO * frame_area:
+            break
+        hull = cv2.convexHull(contour)
+        approx = cv2.approxPolyDP(hull, 0.02 * cv2.arcLength(hull, True), True)
+        if len(approx) == 4 and cv2.isContourConvex(approx) and area < 0.98 * frame_area:
+            quad = _order_corners(approx)
+            return quad / scale, _card_confidence(area, quad)
+    
+    # No clean four-corner outline: box the largest contour
+    contour = contours[0]
+    area = cv2.contourArea(contour)
+    rect = cv2.minAreaRect(contour)
+    rect_area = rect[1][0] * rect[1][1]
+    if rect_area < CARD_MIN_AREA_RATIO * frame_area or rect_area > 0.98 * frame_area:
+        return None, 0.0
+    quad = _order_corners(cv2.boxPoints(rect))
+    return quad / scale, _card_confidence(area, quad) * 0.8
+
+
+class SpectralFeatures:
+    '''
+    One real-input FFT of a gray image and the statistics the analyzers need.
+
+    The plane is converted to float32 and shrunk so its long side is at most
+    SPECTRUM_MAX_SIDE before rfft2, which stores only the non-negative x
+    frequencies. Statistics weight those columns twice (except DC and Nyquist)
+    so they match what the full two-sided spectrum would give.
+    '''
+    def __init__(self, gray, max_side=None, window=None):
+        max_side = SPECTRUM_MAX_SIDE if max_side is None else max_side
+        window = SPECTRUM_WINDOW if window is None else window
+        
+        scale = max_side / max(gray.shape[:2])
+        if scale < 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        plane = gray.astype(np.float32)
+        h, w = plane.shape
+        if window:
+            # Hann window suppresses the edge discontinuity "cross" in the spectrum
+            plane *= np.outer(np.hanning(h), np.hanning(w)).astype(np.float32)
+        
+        self.magnitude = np.abs(np.fft.rfft2(plane)).astype(np.float32, copy=False)
+        self.shape = (h, w)
+        
+        column_weights = np.full(self.magnitude.shape[1], 2, np.float32)
+        column_weights[0] = 1
+        if w % 2 == 0:
+            column_weights[-1] = 1
+        weighted = self.magnitude * column_weights
+        count = h * w
+        self.total = float(weighted.sum(dtype=np.float64))
+        self.mean = self.total / count
+        mean_square = float((weighted * self.magnitude).sum(dtype=np.float64)) / count
+        self.std = float(np.sqrt(max(0.0, mean_square - self.mean ** 2)))
+        
+        # Frequencies in cycles/pixel: |fy| in [0, 0.5], fx in [0, 0.5]
+        fy = np.abs(np.fft.fftfreq(h)).astype(np.float32)[:, None]
+        fx = np.fft.rfftfreq(w).astype(np.float32)[None, :]
+        
+        # Energy outside the central low-frequency box (half the band in each axis)
+        high_band = np.maximum(fx, fy) >= 0.25
+        self.high_band_ratio = float(weighted[high_band].sum(dtype=np.float64)) / self.total if self.total else 0.0
+        
+        # Mean magnitude in SPECTRUM_RADIAL_BINS rings from DC out to the Nyquist corner
+        radius = np.sqrt(fx ** 2 + fy ** 2) / np.sqrt(0.5)
+        bins = np.minimum((radius * SPECTRUM_RADIAL_BINS).astype(np.int32), SPECTRUM_RADIAL_BINS - 1).ravel()
+        energy = np.bincount(bins, weights=weighted.ravel(), minlength=SPECTRUM_RADIAL_BINS)
+        counts = np.bincount(bins, weights=np.broadcast_to(column_weights, weighted.shape).ravel(),
+                             minlength=SPECTRUM_RADIAL_BINS)
+        self.radial_profile = energy / np.maximum(counts, 1)
+
 
 class wayID:
-    def __init__(self, image_path, first_name=None, last_name=None, street_address=None, street_city=None, street_state=None, street_zip=None, date_of_birth=None):
+    def __init__(self, image_path=None, first_name=None, last_name=None, street_address=None, street_city=None, street_state=None, street_zip=None, date_of_birth=None, ocr_backend=None, ocr_mode="auto", preprocess_mode="fast", result_cache=None, duplicate_index=None):
         self.image_path = image_path
+        # None means the process-wide default from ocr.configure() (pytesseract unless set)
+        self.ocr_backend = ocr_backend
         self.provided_info = {
             'first_name': first_name.upper() if first_name else None,
             'last_name': last_name.upper() if last_name else None,
@@ -26,311 +809,115 @@ class wayID:
         self.fake_indicators = []
         self.quality_metrics = {}
         self.image_quality = 0
-        # Enhanced patterns for better name matching
-        self.patterns = {
-            "state_header": re.compile(r"(NEW YORK|CALIFORNIA|TEXAS|FLORIDA|etc)\s+STATE", re.IGNORECASE),
-            "name": [
-                # Multiple name patterns to try
-                re.compile(r"([A-Z'-]+)[,.\s]+([A-Z'-]+(?:\s+[A-Z'-]+)*)", re.MULTILINE),  # Last, First
-                re.compile(r"([A-Z'-]+(?:\s+[A-Z'-]+)*)\s+([A-Z'-]+)", re.MULTILINE),      # First Last
-                re.compile(r"([A-Z'-]+)[,.\s]*\n\s*([A-Z'-]+)", re.MULTILINE),             # Split by newline
-            ],
-            "date_of_birth": [
-                re.compile(r"DOB[,.\s:]+(\d{2}/\d{2}/\d{4})"),
-                re.compile(r"(\d{2}/\d{2}/\d{4})")  # Fallback to any date format
-            ],
-            "license_number": re.compile(r"[A-Z0-9]\s*(\d{3}\s*\d{3}\s*\d{3})\s*[A-Z0-9]"),
-            "address": [
-                re.compile(r"(\d+\s+[A-Z0-9\s]+(?:ST|AVE|RD|BLVD|APT).+?\d{5})"),
-                re.compile(r"(\d+[A-Z0-9\s,]+\d{5})")  # More permissive address pattern
-            ],
-            "expiration": re.compile(r"(?:EXP|EXPIRES?)[,.\s:]+(\d{2}/\d{2}/\d{4})"),
-            "issue_date": re.compile(r"(?:ISS|ISSUED)[,.\s:]+(\d{2}/\d{2}/\d{4})"),
-            "class": re.compile(r"CLASS[,.\s:]*([A-Z])")
-        }
-        # State-specific validation rules
-        self.state_rules = {
-            "AL": {
-                "license_format": r"[0-9]{7}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["350", "351", "352", "353", "354", "355", "356", "357", "358", "359", "360", "361", "362", "363", "364", "365", "366", "367", "368", "369"]
-            },
-            "AK": {
-                "license_format": r"[0-9]{7}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["995", "996", "997", "998", "999"]
-            },
-            "AZ": {
-                "license_format": r"[A-Z][0-9]{8}",
-                "valid_classes": ["A", "B", "C", "D", "G", "M"],
-                "zip_prefix": ["850", "851", "852", "853", "854", "855", "856", "857", "858", "859", "860", "861", "862", "863", "864", "865"]
-            },
-            "AR": {
-                "license_format": r"[0-9]{4,9}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["716", "717", "718", "719", "720", "721", "722", "723", "724", "725", "726", "727", "728", "729"]
-            },
-            "CA": {
-                "license_format": r"[A-Z][0-9]{7}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["900", "901", "902", "903", "904", "905", "906", "907", "908", "909", "910", "911", "912", "913", "914", "915", "916", "917", "918", "919", "920", "921", "922", "923", "924", "925", "926", "927", "928", "929", "930", "931", "932", "933", "934", "935", "936", "937", "938", "939", "940", "941", "942", "943", "944", "945", "946", "947", "948", "949", "950", "951", "952", "953", "954", "955", "956", "957", "958", "959", "960", "961"]
-            },
-            "CO": {
-                "license_format": r"[0-9]{9}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["800", "801", "802", "803", "804", "805", "806", "807", "808", "809", "810", "811", "812", "813", "814", "815", "816"]
-            },
-            "CT": {
-                "license_format": r"[0-9]{9}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["060", "061", "062", "063", "064", "065", "066", "067", "068", "069"]
-            },
-            "DE": {
-                "license_format": r"[0-9]{1,7}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["197", "198", "199"]
-            },
-            "FL": {
-                "license_format": r"[A-Z][0-9]{12}",
-                "valid_classes": ["A", "B", "C", "D", "E", "M"],
-                "zip_prefix": ["320", "321", "322", "323", "324", "325", "326", "327", "328", "329", "330", "331", "332", "333", "334", "335", "336", "337", "338", "339", "340", "341", "342", "343", "344", "345", "346", "347", "348", "349"]
-            },
-            "GA": {
-                "license_format": r"[0-9]{7,9}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["300", "301", "302", "303", "304", "305", "306", "307", "308", "309", "310", "311", "312", "313", "314", "315", "316", "317", "318", "319", "398", "399"]
-            },
-            "HI": {
-                "license_format": r"[A-Z][0-9]{8}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["967", "968"]
-            },
-            "ID": {
-                "license_format": r"[A-Z]{2}[0-9]{6}[A-Z]",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["832", "833", "834", "835", "836", "837", "838"]
-            },
-            "IL": {
-                "license_format": r"[A-Z][0-9]{11,12}",
-                "valid_classes": ["A", "B", "C", "D", "L", "M"],
-                "zip_prefix": ["600", "601", "602", "603", "604", "605", "606", "607", "608", "609", "610", "611", "612", "613", "614", "615", "616", "617", "618", "619", "620", "621", "622", "623", "624", "625", "626", "627", "628", "629"]
-            },
-            "IN": {
-                "license_format": r"[0-9]{9,10}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["460", "461", "462", "463", "464", "465", "466", "467", "468", "469", "470", "471", "472", "473", "474", "475", "476", "477", "478", "479"]
-            },
-            "IA": {
-                "license_format": r"[0-9]{9}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["500", "501", "502", "503", "504", "505", "506", "507", "508", "509", "510", "511", "512", "513", "514", "515", "516", "517", "518", "519", "520", "521", "522", "523", "524", "525", "526", "527", "528"]
-            },
-            "KS": {
-                "license_format": r"[A-Z][0-9]{2}-[0-9]{2}-[0-9]{4}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["660", "661", "662", "663", "664", "665", "666", "667", "668", "669", "670", "671", "672", "673", "674", "675", "676", "677", "678", "679"]
-            },
-            "KY": {
-                "license_format": r"[A-Z][0-9]{8,9}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["400", "401", "402", "403", "404", "405", "406", "407", "408", "409", "410", "411", "412", "413", "414", "415", "416", "417", "418", "419", "420", "421", "422", "423", "424", "425", "426", "427"]
-            },
-            "LA": {
-                "license_format": r"[0-9]{1,9}",
-                "valid_classes": ["A", "B", "C", "D", "E", "M"],
-                "zip_prefix": ["700", "701", "702", "703", "704", "705", "706", "707", "708", "709", "710", "711", "712", "713", "714"]
-            },
-            "ME": {
-                "license_format": r"[0-9]{7}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["039", "040", "041", "042", "043", "044", "045", "046", "047", "048", "049"]
-            },
-            "MD": {
-                "license_format": r"[A-Z][0-9]{12}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["206", "207", "208", "209", "210", "211", "212", "213", "214", "215", "216", "217", "218", "219"]
-            },
-            "MA": {
-                "license_format": r"S[0-9]{8}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["010", "011", "012", "013", "014", "015", "016", "017", "018", "019", "020", "021", "022", "023", "024", "025", "026", "027"]
-            },
-            "MI": {
-                "license_format": r"[A-Z][0-9]{12}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["480", "481", "482", "483", "484", "485", "486", "487", "488", "489", "490", "491", "492", "493", "494", "495", "496", "497", "498", "499"]
-            },
-            "MN": {
-                "license_format": r"[A-Z][0-9]{12}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["550", "551", "552", "553", "554", "555", "556", "557", "558", "559", "560", "561", "562", "563", "564", "565", "566", "567"]
-            },
-            "MS": {
-                "license_format": r"[0-9]{9}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["386", "387", "388", "389", "390", "391", "392", "393", "394", "395", "396", "397"]
-            },
-            "MO": {
-                "license_format": r"[A-Z][0-9]{5,9}",
-                "valid_classes": ["A", "B", "C", "D", "E", "F", "M"],
-                "zip_prefix": ["630", "631", "632", "633", "634", "635", "636", "637", "638", "639", "640", "641", "642", "643", "644", "645", "646", "647", "648", "649", "650", "651", "652", "653", "654", "655", "656", "657", "658"]
-            },
-            "MT": {
-                "license_format": r"[A-Z][0-9]{8}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["590", "591", "592", "593", "594", "595", "596", "597", "598", "599"]
-            },
-            "NE": {
-                "license_format": r"[A-Z][0-9]{6,8}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["680", "681", "682", "683", "684", "685", "686", "687", "688", "689", "690", "691", "692", "693"]
-            },
-            "NV": {
-                "license_format": r"[0-9]{9,10}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["889", "890", "891", "892", "893", "894", "895", "896", "897", "898"]
-            },
-            "NH": {
-                "license_format": r"[0-9]{2}[A-Z]{3}[0-9]{5}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["030", "031", "032", "033", "034", "035", "036", "037", "038"]
-            },
-            "NJ": {
-                "license_format": r"[A-Z][0-9]{14}",
-                "valid_classes": ["A", "B", "C", "D", "E", "M"],
-                "zip_prefix": ["070", "071", "072", "073", "074", "075", "076", "077", "078", "079", "080", "081", "082", "083", "084", "085", "086", "087", "088", "089"]
-            },
-            "NM": {
-                "license_format": r"[0-9]{9}",
-                "valid_classes": ["A", "B", "C", "D", "E", "M"],
-                "zip_prefix": ["870", "871", "872", "873", "874", "875", "876", "877", "878", "879", "880", "881", "882", "883", "884"]
-            },
-            "NY": {
-                "license_format": r"\d{3}\s?\d{3}\s?\d{3}",
-                "valid_classes": ["A", "B", "C", "D", "E", "M"],
-                "zip_prefix": ["100", "101", "102", "103", "104", "105", "106", "107", "108", "109", "110", "111", "112", "113", "114", "115", "116", "117", "118", "119", "120", "121", "122", "123", "124", "125", "126", "127", "128", "129", "130", "131", "132", "133", "134", "135", "136", "137", "138", "139", "140", "141", "142", "143", "144", "145", "146", "147", "148", "149"]
-            },
-            "NC": {
-                "license_format": r"[0-9]{12}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["270", "271", "272", "273", "274", "275", "276", "277", "278", "279", "280", "281", "282", "283", "284", "285", "286", "287", "288", "289"]
-            },
-            "ND": {
-                "license_format": r"[A-Z]{3}-[0-9]{2}-[0-9]{4}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["580", "581", "582", "583", "584", "585", "586", "587", "588"]
-            },
-            "OH": {
-                "license_format": r"[A-Z][0-9]{7}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["430", "431", "432", "433", "434", "435", "436", "437", "438", "439", "440", "441", "442", "443", "444", "445", "446", "447", "448", "449", "450", "451", "452", "453", "454", "455", "456", "457", "458"]
-            },
-            "OK": {
-                "license_format": r"[A-Z][0-9]{9}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["730", "731", "732", "733", "734", "735", "736", "737", "738", "739", "740", "741", "742", "743", "744", "745", "746", "747", "748", "749"]
-            },
-            "OR": {
-                "license_format": r"[0-9]{1,9}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["970", "971", "972", "973", "974", "975", "976", "977", "978", "979"]
-            },
-            "PA": {
-                "license_format": r"[0-9]{8}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["150", "151", "152", "153", "154", "155", "156", "157", "158", "159", "160", "161", "162", "163", "164", "165", "166", "167", "168", "169", "170", "171", "172", "173", "174", "175", "176", "177", "178", "179", "180", "181", "182", "183", "184", "185", "186", "187", "188", "189", "190", "191", "192", "193", "194", "195", "196"]
-            },
-            "RI": {
-                "license_format": r"[0-9]{7}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["028", "029"]
-            },
-            "SC": {
-                "license_format": r"[0-9]{5,11}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["290", "291", "292", "293", "294", "295", "296", "297", "298", "299"]
-            },
-            "SD": {
-                "license_format": r"[0-9]{6,10}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["570", "571", "572", "573", "574", "575", "576", "577"]
-            },
-            "TN": {
-                "license_format": r"[0-9]{7,9}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["370", "371", "372", "373", "374", "375", "376", "377", "378", "379", "380", "381", "382", "383", "384", "385"]
-            },
-            "TX": {
-                "license_format": r"[0-9]{7,8}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["750", "751", "752", "753", "754", "755", "756", "757", "758", "759", "760", "761", "762", "763", "764", "765", "766", "767", "768", "769", "770", "771", "772", "773", "774", "775", "776", "777", "778", "779", "780", "781", "782", "783", "784", "785", "786", "787", "788", "789", "790", "791", "792", "793", "794", "795", "796", "797", "798", "799"]
-            },
-            "UT": {
-                "license_format": r"[0-9]{4,10}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["840", "841", "842", "843", "844", "845", "846", "847"]
-            },
-            "VT": {
-                "license_format": r"[0-9]{8}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["050", "051", "052", "053", "054", "055", "056", "057", "058", "059"]
-            },
-            "VA": {
-                "license_format": r"[A-Z][0-9]{8,11}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["201", "220", "221", "222", "223", "224", "225", "226", "227", "228", "229", "230", "231", "232", "233", "234", "235", "236", "237", "238", "239", "240", "241", "242", "243", "244", "245"]
-            },
-            "WA": {
-                "license_format": r"[A-Z]{7}[0-9]{3}[A-Z]{2}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["980", "981", "982", "983", "984", "985", "986", "987", "988", "989", "990", "991", "992", "993", "994"]
-            },
-            "WV": {
-                "license_format": r"[A-Z][0-9]{6}",
-                "valid_classes": ["A", "B", "C", "D", "E", "F", "M"],
-                "zip_prefix": ["247", "248", "249", "250", "251", "252", "253", "254", "255", "256", "257", "258", "259", "260", "261", "262", "263", "264", "265", "266", "267", "268"]
-            },
-            "WI": {
-                "license_format": r"[A-Z][0-9]{13}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["530", "531", "532", "533", "534", "535", "536", "537", "538", "539", "540", "541", "542", "543", "544", "545", "546", "547", "548", "549"]
-            },
-            "WY": {
-                "license_format": r"[0-9]{9,10}",
-                "valid_classes": ["A", "B", "C", "M"],
-                "zip_prefix": ["820", "821", "822", "823", "824", "825", "826", "827", "828", "829", "830", "831"]
-            },
-            "DC": {
-                "license_format": r"[0-9]{7}",
-                "valid_classes": ["A", "B", "C", "D", "M"],
-                "zip_prefix": ["200", "202", "203", "204", "205"]
-            }
-        }
-        self.required_fields = {'name', 'date_of_birth', 'license_number', 'address', 'expiration'}
+        self.patterns = PATTERNS
+        self.state_rules = STATE_RULES
+        self.required_fields = REQUIRED_FIELDS
+        # "roi": OCR each detected text segment separately; "page": one pass over the
+        # whole card. "auto" picks roi only for persistent backends, where a crop costs
+        # a pipe round-trip rather than a new tesseract process.
+        self.ocr_mode = ocr_mode
+        # "fast" (downsample, median filter, adaptive threshold) or "quality" (full-res NLM denoise)
+        self.preprocess_mode = preprocess_mode
+        self.preprocess_timings = {}
+        self.extracted_fields = {}
+        # Per-block ELA heatmap of the last tamper check; not kept in the result cache
+        self.tamper_heatmap = None
+        # (points, finding) from the EXIF/format/JPEG checks, kept for the result cache
+        self.metadata_checks = []
+        # None means the process-wide default from resultcache.configure() (no caching unless set)
+        self.result_cache = result_cache
+        # None means the process-wide default from nearduplicates.configure() (no check unless set)
+        self.duplicate_index = duplicate_index
+        self.perceptual_hash = None
+        # Matches from the near-duplicate index; None when it was not checked
+        self.near_duplicates = None
+        # Set by verify(profile=...): pstats.Stats for that verification
+        self.profile_stats = None
+        self._recorder = instrument.NULL_RECORDER
+        # Per-image diagnostics, collected only while DEBUG logging is enabled
+        self._debug = None
+        self._context = None
+
+    @classmethod
+    def from_bytes(cls, data, **applicant_info):
+        '''
+        Build a wayID for an encoded image held in memory (e.g. an HTTP request body)
+        '''
+        return cls._from_context(ImageContext.from_bytes(data), applicant_info)
+
+    @classmethod
+    def from_file(cls, fileobj, **applicant_info):
+        '''
+        Build a wayID from a binary file-like object without writing it to disk
+        '''
+        return cls._from_context(ImageContext.from_file(fileobj), applicant_info)
+
+    @classmethod
+    def from_array(cls, image, **applicant_info):
+        '''
+        Build a wayID for an already-decoded BGR (or gray) numpy image
+        '''
+        return cls._from_context(ImageContext.from_array(image), applicant_info)
+
+    @classmethod
+    def _from_context(cls, context, applicant_info):
+        way = cls(None, **applicant_info)
+        way._context = context
+        return way
+
+    @property
+    def context(self):
+        '''
+        Decoded image shared by all analyzers, loaded on first use
+        '''
+        if self._context is None:
+            self._context = self._recorder.timed("decode", ImageContext.from_path, self.image_path)
+        return self._context
         
     def _preprocess_image(self):
         '''
         Preprocessing focused on strongest differentiators with aggressive scoring for fakes
         '''
-        # Read image
-        image = cv2.imread(self.image_path, cv2.IMREAD_COLOR)
+        ctx = self.context
+        timed = self._recorder.timed
         
-        height, width = image.shape[:2]
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        ycrcb = cv2.cvtColor(image, cv2.COLOR_BGR2YCrCb)
+        # Image metrics run on the card resampled to the canonical size, so their cost
+        # and their values do not depend on the camera; only resolution_score looks
+        # at the capture itself
+        card = timed("card_detection", lambda: ctx.canonical)
+        timed("color_planes", _load_planes, card)
         
         # Calculate metrics focusing on key differentiators
         quality_metrics = {
-            "resolution_score": max(0, 100 - ((width * height) / (1000 * 1000) * 100)),
-            "color_transition": min(100, self._calculate_color_transitions(hsv)),
-            "rainbow_effect": min(100, (np.std(hsv[:, :, 0]) / 75) * 100),
-            "blur_score": self._calculate_blur_score(gray),
-            "saturation_score": min(100, (np.mean(hsv[:, :, 1]) / 255) * 150),
-            "digital_artifacts": min(100, (np.std(ycrcb[::8, ::8, :]) / np.std(ycrcb)) * 50),
-            "microprint_score": self._analyze_microprint(gray)
+            name: timed(f"metrics.{name}", metric, card)
+            for name, metric in self._quality_metric_functions().items()
         }
+        self._score_image_quality(quality_metrics)
         
+        # Proceed with normal preprocessing for OCR
+        return self._prepare_for_ocr(ctx.card.gray)
+
+    def _quality_metric_functions(self):
+        '''
+        {metric name: function(canonical card)} in report order; each metric is independent
+        '''
+        ctx = self.context
+        return {
+            "resolution_score": lambda card: max(0, 100 - ((ctx.width * ctx.height) / (1000 * 1000) * 100)),
+            "color_transition": lambda card: min(100, self._calculate_color_transitions(card)),
+            "rainbow_effect": lambda card: min(100, (np.std(card.hsv[:, :, 0]) / 75) * 100),
+            "blur_score": lambda card: self._calculate_blur_score(card.gray),
+            "saturation_score": lambda card: min(100, (np.mean(card.hsv[:, :, 1]) / 255) * 150),
+            "digital_artifacts": lambda card: min(100, (np.std(card.ycrcb[::8, ::8, :]) / np.std(card.ycrcb)) * 50),
+            "microprint_score": self._analyze_microprint,
+            "texture_uniformity": self._analyze_texture_uniformity,
+            "cartoon_score": self._detect_cartoon
+        }
+
+    def _score_image_quality(self, quality_metrics):
+        '''
+        Turn the quality metrics into fake indicators and the 0-100 image fraud score
+        '''
         # Store metrics for fraud detection
         self.quality_metrics.update(quality_metrics)
         
@@ -358,6 +945,9 @@ class wayID:
         if quality_metrics["digital_artifacts"] > 55:  # Lower threshold
             self.fake_indicators.append("Digital scanning artifacts detected")
             self.image_quality += 10  # Add penalty
+        if quality_metrics["cartoon_score"] > 80:
+            self.fake_indicators.append("Cartoon-like image (solid colors, limited palette)")
+            self.image_quality += 10  # Add penalty
             
         # Additional penalty for multiple indicators
         if len(self.fake_indicators) >= 3:
@@ -374,7 +964,9 @@ class wayID:
             # Secondary metrics - minimal impact
             "rainbow_effect": 0.1,        # Further reduced
             "blur_score": 0.1,           # Minimal
-            "saturation_score": 0.1       # Minimal
+            "saturation_score": 0.1,      # Minimal
+            "texture_uniformity": 0.1,    # Minimal; no indicator, it tracks JPEG quality and capture size
+            "cartoon_score": 0.1          # Minimal
         }
         
         weighted_scores = [
@@ -402,24 +994,22 @@ class wayID:
             base_score *= 1.2  # Additional 20% boost for very high individual scores
         
         self.image_quality = min(100, base_score)
-        
-        # Proceed with normal preprocessing for OCR
-        contrast = cv2.convertScaleAbs(gray, alpha=1.75, beta=0)
-        denoised = cv2.fastNlMeansDenoising(contrast, None, 5, 7, 21)
-        _, binary = cv2.threshold(denoised, 127, 255, cv2.THRESH_BINARY)
-        return binary
 
     def _extract_text_from_image(self, image):
         '''
         Simplified text extraction with minimal processing
         '''
-        custom_config = (
-            '--oem 3 '
-            '--psm 6 '
-            '-c tessedit_char_whitelist="ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 ,.\'()-/" '
-        )
-        
-        text = pytesseract.image_to_string(image, config=custom_config, lang='eng')
+        backend = self.ocr_backend or ocr.get_default_backend()
+        mode = self.ocr_mode
+        if mode == "auto":
+            mode = "roi" if backend.persistent else "page"
+        
+        text = None
+        if mode == "roi":
+            text = self._extract_text_from_regions(image, backend)
+        if text is None:
+            # Whole card in one pass (also the fallback when no text lines are found)
+            text = backend.image_to_string(image, psm=6, whitelist=ocr.DEFAULT_WHITELIST, lang='eng')
         
         # Basic cleaning
         text = text.strip()
@@ -427,6 +1017,127 @@ class wayID:
         
         return text
 
+    def _find_text_regions(self, binary):
+        '''
+        Layout stage for region OCR: find text segments in the binarized card.
+
+        Glyph-sized connected components are projected onto the vertical axis
+        (the same horizontal-projection idea as _analyze_text_placement, but
+        ignoring the photo and other large dark blobs); each run of rows is a text
+        line, split into segments wherever the gap between glyphs is wide.
+        Returns padded (x, y, w, h) boxes in reading order.
+        '''
+        height, width = binary.shape[:2]
+        ink = (binary < 128).astype(np.uint8)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        stats = stats[1:]
+        xs, ys = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+        ws, hs = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+        # Character-sized blobs only: drops specks, the photo, rules and barcode bars
+        glyphs = ((hs >= 6) & (hs <= height * 0.12) & (ws <= hs * 4) & (ws * 6 >= hs)
+                  & (stats[:, cv2.CC_STAT_AREA] >= 10))
+        xs, ys, ws, hs = xs[glyphs], ys[glyphs], ws[glyphs], hs[glyphs]
+        if len(xs) < 2:
+            return []
+        max_band_height = np.median(hs) * 4
+        
+        # Horizontal projection of glyph extents
+        edges = np.zeros(height + 1, np.int32)
+        np.add.at(edges, ys, 1)
+        np.add.at(edges, ys + hs, -1)
+        rows = np.cumsum(edges[:-1]) > 0
+        changes = np.flatnonzero(np.diff(np.concatenate(([0], rows.astype(np.int8), [0]))))
+        bands = zip(changes[::2], changes[1::2])
+        
+        centers = ys + hs // 2
+        regions = []
+        for top, bottom in bands:
+            in_band = np.flatnonzero((centers >= top) & (centers < bottom))
+            if len(in_band) < 2 or bottom - top > max_band_height:
+                continue
+            in_band = in_band[np.argsort(xs[in_band])]
+            band_height = bottom - top
+            
+            # Split the line at gaps wider than ~1.5 character heights
+            segment = [in_band[0]]
+            right = xs[in_band[0]] + ws[in_band[0]]
+            for i in in_band[1:]:
+                if xs[i] - right > band_height * 1.5:
+                    regions.append((segment, top, bottom))
+                    segment = []
+                segment.append(i)
+                right = max(right, xs[i] + ws[i])
+            regions.append((segment, top, bottom))
+        
+        boxes = []
+        for segment, top, bottom in regions:
+            if len(segment) < 2:
+                continue
+            pad = max(2, (bottom - top) // 4)
+            x0 = max(0, int(xs[segment].min()) - pad)
+            x1 = min(width, int((xs[segment] + ws[segment]).max()) + pad)
+            y0, y1 = max(0, int(top) - pad), min(height, int(bottom) + pad)
+            boxes.append((x0, y0, x1 - x0, y1 - y0))
+        
+        boxes.sort(key=lambda box: (box[1], box[0]))
+        return boxes[:MAX_OCR_REGIONS]
+
+    def _classify_text_line(self, line):
+        '''
+        Guess which ID field a single OCR'd text segment holds (None if unknown)
+        '''
+        if re.search(r"\bDOB\b|BIRTH", line):
+            return "date_of_birth"
+        if re.search(r"\bEXP", line):
+            return "expiration"
+        if re.search(r"\b(?:DL|LIC|LICENSE NO|NO)\b.*\d", line) or re.fullmatch(r"[A-Z]?\d[\d -]{5,}[A-Z]?", line):
+            return "license_number"
+        if FIELD_VALUE_PATTERNS["address"].match(line) or re.search(r"\b\d{5}\b", line):
+            return "address"
+        words = re.findall(r"[A-Z'-]+", line)
+        if (FIELD_VALUE_PATTERNS["name"].match(line) and len(line) >= 3
+                and not any(word in HEADER_WORDS for word in words)):
+            return "name"
+        return None
+
+    def _extract_text_from_regions(self, binary, backend):
+        '''
+        Region OCR: read each text segment as a single line, in parallel.
+
+        Segments that look like a known field but do not parse are re-read with
+        that field's whitelist (see FIELD_OCR). Fills self.extracted_fields and
+        returns the lines joined in reading order, or None when the layout stage
+        found too little text to be trusted.
+        '''
+        boxes = self._find_text_regions(binary)
+        if len(boxes) < 2:
+            return None
+        
+        def read(crop, field):
+            psm, whitelist = FIELD_OCR[field]
+            text = backend.image_to_string(crop, psm=psm, whitelist=whitelist, lang='eng')
+            return re.sub(r'\s+', ' ', text).strip().upper()
+        
+        crops = [binary[y:y+h, x:x+w] for x, y, w, h in boxes]
+        executor = _ocr_thread_pool()
+        lines = list(executor.map(read, crops, ["line"] * len(crops)))
+        fields = [self._classify_text_line(line) for line in lines]
+        
+        retry = [i for i, field in enumerate(fields)
+                 if field and not FIELD_VALUE_PATTERNS[field].search(lines[i])]
+        for i, text in zip(retry, executor.map(read, [crops[i] for i in retry], [fields[i] for i in retry])):
+            if FIELD_VALUE_PATTERNS[fields[i]].search(text):
+                lines[i] = text
+        
+        self.extracted_fields = {}
+        for line, field in zip(lines, fields):
+            if field and field not in self.extracted_fields:
+                match = FIELD_VALUE_PATTERNS[field].search(line)
+                if match:
+                    self.extracted_fields[field] = line if field in ("name", "address") else match.group(0)
+        
+        return " ".join(line for line in lines if line)
+
     def _validate_dl_text(self, text):
         result = {
             "validation_details": {},
@@ -438,7 +1149,9 @@ class wayID:
         
         # Normalize text for comparison
         text = text.upper()
-        print(f"Searching in text: {text}")
+        # Only the size goes in the debug record: the text itself is personal data
+        if self._debug is not None:
+            self._debug["ocr_chars"] = len(text)
 
         # Validate ZIP code
         if self.provided_info.get('street_zip') and self.provided_info.get('street_state'):
@@ -508,12 +1221,7 @@ class wayID:
                                                                if "last name" not in f.lower()]
 
         # Check for common fake indicators in text
-        fake_indicators = [
-            "SAMPLE", "SPECIMEN", "NOT FOR IDENTIFICATION", "VOID", 
-            "NON-VALID", "INVALID", "TEST", "DEMO", "EXAMPLE",
-            "NOT A VALID", "NOT VALID", "TRAINING", "PRACTICE"
-        ]
-        for indicator in fake_indicators:
+        for indicator in TEXT_FAKE_INDICATORS:
             if indicator in text:
                 result["text_fraud_score"] += 50
                 result["scoring_factors"].append(f"Found fake indicator: {indicator}")
@@ -535,19 +1243,242 @@ class wayID:
 
         return result
 
-    def output(self):
+    def verify(self, timings=None, memory=None, profile=None):
+        '''
+        Run every check and return a VerificationResult (reweighted scoring, 20% text, 80% image)
+
+        timings=True attaches per-stage seconds to result.timings; memory=True also
+        records the tracemalloc peak in result.peak_memory. None uses the process
+        defaults from instrument.configure(). profile=True (or a file path to dump
+        to) runs this verification under cProfile and keeps the pstats.Stats in
+        self.profile_stats. cProfile only sees the calling thread, so a profiled
+        verification runs its stages in sequence rather than on the stage threads.
+        '''
+        self._start_verification(timings, memory)
+        if profile:
+            result, self.profile_stats = instrument.profile_call(lambda: self._measured_verify(sequential=True),
+                                                                 None if profile is True else profile)
+            return result
+        return self._measured_verify()
+
+    def _measured_verify(self, sequential=False):
+        with instrument.measure(self._recorder, self.image_path):
+            result = self._verify(sequential)
+        return self._finish_verification(result)
+
+    def _start_verification(self, timings=None, memory=None):
+        '''
+        Pick the recorder and debug collection for one verification (shared with aio.verify)
+        '''
+        self._recorder = instrument.recorder(timings, memory)
+        self._debug = {} if logger.isEnabledFor(logging.DEBUG) else None
+        return self._recorder
+
+    def _finish_verification(self, result):
+        rec = self._recorder
+        if rec.enabled:
+            result.timings = rec.timings
+            result.peak_memory = rec.peak_memory
+        if self._debug is not None:
+            self._log_debug_record(result)
+        return result
+
+    def _image_label(self):
+        return os.path.basename(self.image_path) if self.image_path else "in-memory image"
+
+    def _log_debug_record(self, result):
+        '''
+        One structured DEBUG record per image; the dict is also attached as record.wayid
+        '''
+        debug = self._debug
+        debug.update({
+            "image": self._image_label(),
+            "fraud_score": round(float(result.fraud_score), 1),
+            "quality_metrics": {k: round(v, 1) for k, v in result.quality_metrics.items()},
+            "fake_indicators": result.fake_indicators,
+            "ocr_mode": self.ocr_mode,
+            "preprocess_mode": self.preprocess_mode,
+            "fields_found": sorted(result.extracted_data),
+            "card_confidence": round(result.card_confidence, 2),
+        })
+        if result.timings is not None:
+            debug["timings_ms"] = {stage: round(seconds * 1000, 2) for stage, seconds in result.timings.items()}
+        logger.debug("Verified %s: %s", debug["image"], debug, extra={"wayid": debug})
+
+    def _verify(self, sequential=False):
+        cache = self._result_cache()
+        analysis = None
+        if cache is not None:
+            key, analysis = self._recorder.timed("cache_lookup", self._cache_lookup, cache)
+        stopped = self._check_near_duplicates(analysis)
+        if stopped is not None:
+            return stopped
+        if analysis is not None:
+            return self._verify_cached(analysis)
+        
+        # Decode here rather than in whichever stage touches the image first
+        self._recorder.timed("decode", lambda: self.context.image)
+        pool = None if sequential else _stage_thread_pool()
+        stages = self._run_stages_parallel(pool) if pool is not None else self._run_stages()
+        if cache is not None:
+            self._recorder.timed("cache_store", self._cache_store, cache, key, stages)
+        return self._build_result(*stages)
+
+    def _run_stages(self):
+        '''
+        Every check in sequence; returns the _build_result() arguments
+        '''
+        timed = self._recorder.timed
+        processed_image = timed("preprocess", self._preprocess_image)
+        extracted_text = timed("ocr", self._extract_text_from_image, processed_image)
+        validation_result = timed("text_validation", self._validate_dl_text, extracted_text)
+        metadata = timed("metadata", self._analyze_metadata)
+        headshot = timed("headshot", self._validate_headshot, self.context.card)
+        tamper = timed("tamper", self._check_card_tampering)
+        return extracted_text, validation_result, metadata, headshot, tamper
+
+    def _run_stages_parallel(self, pool):
         '''
-        Enhanced output with reweighted scoring (20% text, 80% image)
+        _run_stages() as a stage graph: OCR, metadata, headshot, ELA and each image
+        metric run on the stage threads as soon as their inputs are ready
         '''
-        processed_image = self._preprocess_image()
-        extracted_text = self._extract_text_from_image(processed_image)
-        validation_result = self._validate_dl_text(extracted_text)
+        ctx = self.context
+        metrics = self._quality_metric_functions()
+        stages = {
+            "card_detection": ((), lambda: ctx.canonical),
+            "color_planes": (("card_detection",), _load_planes),
+            "ocr_prep": (("card_detection",), lambda card: self._prepare_for_ocr(ctx.card.gray)),
+            "ocr": (("ocr_prep",), self._extract_text_from_image),
+            "text_validation": (("ocr",), self._validate_dl_text),
+            "metadata": ((), self._analyze_metadata),
+            "headshot": (("card_detection",), lambda card: self._validate_headshot(ctx.card)),
+            "tamper": (("card_detection",), lambda card: self._check_card_tampering()),
+            "image_score": (tuple(f"metrics.{name}" for name in metrics),
+                            lambda *values: self._score_image_quality(dict(zip(metrics, values)))),
+        }
+        for name, metric in metrics.items():
+            stages[f"metrics.{name}"] = (("color_planes",), metric)
         
+        results = _run_stage_graph(stages, pool, self._recorder.timed)
+        return results["ocr"], results["text_validation"], results["metadata"], results["headshot"], results["tamper"]
+
+    def _result_cache(self):
+        return self.result_cache if self.result_cache is not None else resultcache.get_default_cache()
+
+    def _cache_lookup(self, cache):
+        '''
+        (key, cached ImageAnalysis or None) for this image and the options that change its analysis
+        '''
+        ctx = self.context
+        backend = self.ocr_backend or ocr.get_default_backend()
+        key = resultcache.content_key(ctx.data, ctx.image if ctx.data is None else None, ocr_backend=type(backend).__name__,
+                                      ocr_mode=self.ocr_mode, preprocess_mode=self.preprocess_mode,
+                                      extension=self._file_extension())
+        analysis = cache.get(key)
+        if self._debug is not None:
+            self._debug["cache"] = "miss" if analysis is None else "hit"
+        return key, analysis
+
+    def _cache_store(self, cache, key, stages):
+        extracted_text, _, _, headshot, tamper = stages
+        cache.put(key, ImageAnalysis(
+            card_detection=self.context.card_detection,
+            quality_metrics=dict(self.quality_metrics),
+            image_quality=self.image_quality,
+            fake_indicators=list(self.fake_indicators),
+            extracted_text=extracted_text,
+            extracted_fields=dict(self.extracted_fields),
+            metadata_checks=list(self.metadata_checks),
+            headshot=(headshot[0], list(headshot[1])),
+            tamper=tamper,
+            perceptual_hash=self.perceptual_hash,
+        ))
+
+    def _duplicate_index(self):
+        return self.duplicate_index if self.duplicate_index is not None else nearduplicates.get_default_index()
+
+    def _check_near_duplicates(self, analysis=None):
+        '''
+        Look the card up in the near-duplicate index and add it there. Returns the
+        early-stop result when the index's stop_distance is reached, otherwise None
+        '''
+        index = self._duplicate_index()
+        if index is None:
+            return None
+        timed = self._recorder.timed
+        ctx = self.context
+        card_detection = analysis.card_detection if analysis is not None else None
+        self.perceptual_hash = analysis.perceptual_hash if analysis is not None else None
+        if self.perceptual_hash is None:
+            self.perceptual_hash = timed("perceptual_hash", lambda: nearduplicates.perceptual_hash(ctx.canonical.gray))
+        
+        submission = nearduplicates.fingerprint(ctx.data if ctx.data is not None else ctx.image, self.provided_info)
+        self.near_duplicates = timed("near_duplicates", index.check, self.perceptual_hash, submission, self.image_path)
+        if self._debug is not None:
+            self._debug["near_duplicates"] = len(self.near_duplicates)
+        if not index.should_stop(self.near_duplicates):
+            return None
+        
+        # A reused template: report it without paying for OCR and the image checks
+        closest = self.near_duplicates[0]
+        card_corners, card_confidence = card_detection or ctx.card_detection
+        return VerificationResult(
+            fraud_score=100.0,
+            text_fraud_score=0.0,
+            image_fraud_score=0.0,
+            metadata_score=0.0,
+            text_weight=0.2,
+            image_weight=0.7,
+            metadata_weight=0.1,
+            card_corners=None if card_corners is None else np.round(card_corners).astype(int).tolist(),
+            card_confidence=float(card_confidence),
+            scoring_factors=[f"Near-duplicate of earlier submission {closest['id']} "
+                             f"({closest['distance']} bits apart); remaining checks skipped"],
+            near_duplicates=self.near_duplicates,
+        )
+
+    def _verify_cached(self, analysis):
+        '''
+        Finish a verification from a cached ImageAnalysis: only the applicant
+        text matching and the file name/timestamp checks run again
+        '''
+        timed = self._recorder.timed
+        # The cached entry is shared, so everything that ends up in the result is copied
+        self.context.card_detection = analysis.card_detection
+        self.quality_metrics = dict(analysis.quality_metrics)
+        self.image_quality = analysis.image_quality
+        self.fake_indicators = list(analysis.fake_indicators)
+        self.extracted_fields = dict(analysis.extracted_fields)
+        self.metadata_checks = list(analysis.metadata_checks)
+        
+        validation_result = timed("text_validation", self._validate_dl_text, analysis.extracted_text)
+        metadata = timed("metadata", lambda: self._score_metadata(self._file_metadata_checks() + self.metadata_checks))
+        headshot_score, headshot_issues = analysis.headshot
+        return self._build_result(analysis.extracted_text, validation_result, metadata,
+                                  (headshot_score, list(headshot_issues)), analysis.tamper)
+
+    def _check_card_tampering(self):
+        '''
+        ELA needs the original JPEG block grid, so it runs on the frame, restricted to the card.
+        Returns (score, suspicious block count); the heatmap is left in tamper_heatmap.
+        '''
+        ctx = self.context
+        card_corners, _ = ctx.card_detection
+        score, heatmap = self._detect_photo_tampering(ctx, card=card_corners)
+        return float(score), int(np.count_nonzero(heatmap > ELA_SUSPICIOUS_LEVEL))
+
+    def _build_result(self, extracted_text, validation_result, metadata, headshot, tamper):
+        '''
+        Combine the stage outputs into the weighted fraud score and a VerificationResult
+        '''
         # Calculate image fraud score (already 0-100, where 0 is good)
         image_fraud_score = self.image_quality
+        metadata_score, metadata_findings = metadata
         
-        # Add metadata analysis
-        metadata_score, metadata_findings = self._analyze_metadata()
+        # Headshot and error-level checks are reported alongside the scores but not weighted yet
+        card_corners, card_confidence = self.context.card_detection
+        headshot_score, headshot_issues = headshot
+        tamper_score, suspicious_blocks = tamper
         
         # Adjust weights to include metadata
         if metadata_score > 80:
@@ -579,55 +1510,166 @@ class wayID:
         # Clamp between 0 and 100
         normalized_score = min(100, max(0, normalized_score))
         
-        result = {
-            "fraud_score": round(normalized_score, 1),
-            "risk_level": "High" if normalized_score >= 75 else "Medium" if normalized_score >= 50 else "Low",
-            "component_scores": {
-                "text_fraud_score": {
-                    "score": round(validation_result["text_fraud_score"], 1),
-                    "weight": f"{text_weight*100}%"
-                },
-                "image_fraud_score": {
-                    "score": round(image_fraud_score, 1),
-                    "weight": f"{image_weight*100}%"
-                },
-                "metadata_analysis": {
-                    "score": round(metadata_score, 1),
-                    "findings": metadata_findings,
-                    "weight": f"{metadata_weight*100}%"
-                }
-            },
-            "match_scores": validation_result["match_scores"],
-            "scoring_factors": validation_result["scoring_factors"],
-            "quality_metrics": {k: f"{v:.1f}%" for k, v in self.quality_metrics.items()},
-            "fake_indicators": self.fake_indicators,
-            "raw_text": extracted_text
-        }
-        
-        # Update interpretation guide
-        result["score_interpretation"] = {
-            "all_scores": "0-100 (0 = good/authentic, 100 = bad/potentially fraudulent)",
-            "weighting": {
-                "text_matching": f"{text_weight*100}% of total score",
-                "image_quality": f"{image_weight*100}% of total score",
-                "metadata_analysis": f"{metadata_weight*100}% of total score"
-            },
-            "risk_levels": {
-                "Low": "0-49",
-                "Medium": "50-74",
-                "High": "75-100"
-            }
-        }
-        
-        return json.dumps(result, indent=2)
+        # The stages return numpy scalars in places; the result holds plain floats
+        return VerificationResult(
+            fraud_score=float(normalized_score),
+            text_fraud_score=float(validation_result["text_fraud_score"]),
+            image_fraud_score=float(image_fraud_score),
+            metadata_score=float(metadata_score),
+            text_weight=text_weight,
+            image_weight=image_weight,
+            metadata_weight=metadata_weight,
+            metadata_findings=metadata_findings,
+            card_corners=None if card_corners is None else np.round(card_corners).astype(int).tolist(),
+            card_confidence=float(card_confidence),
+            headshot_score=float(headshot_score),
+            headshot_issues=headshot_issues,
+            tamper_score=float(tamper_score),
+            suspicious_blocks=int(suspicious_blocks),
+            match_scores=validation_result["match_scores"],
+            scoring_factors=validation_result["scoring_factors"],
+            quality_metrics={k: float(v) for k, v in self.quality_metrics.items()},
+            fake_indicators=self.fake_indicators,
+            extracted_data=self.extracted_fields,
+            raw_text=extracted_text,
+            near_duplicates=self.near_duplicates
+        )
+
+    def output(self):
+        '''
+        verify() formatted as the original indented JSON report
+        '''
+        return json.dumps(self.verify().to_legacy_dict(), indent=2)
+
+    @classmethod
+    def verify_batch(cls, manifest, workers=None, ordered=True, max_pending=None, ocr_pool_size=0,
+                     structured=False, timings=False, memory=False, cache=None, duplicates=None):
+        '''
+        Verify many images on a process pool, yielding results as they finish.
+
+        manifest is either a dict of image_path -> applicant info (the input.json
+        layout) or an iterable of (image_path, info) pairs; it is consumed lazily.
+        Yields (image_path, output, error) tuples where output is the output()
+        JSON string (a VerificationResult if structured=True) and error is None,
+        or output is None and error describes why that image failed. A failing
+        image never stops the batch.
+
+        If a worker process dies (a native crash, the OOM killer), the pool is
+        restarted and the images that were in flight are retried one at a time;
+        an image that kills its worker again is reported as failed.
 
-    def _analyze_microprint(self, gray):
+        With ordered=True results are yielded in manifest order, each one as soon
+        as it and everything before it are done; with ordered=False they are
+        yielded in completion order. At most max_pending images (default
+        4 x workers) are in flight or buffered at any time.
+
+        ocr_pool_size > 0 gives every worker process its own warm TesseractPool
+        of that size (see ocr.configure); 0 keeps one tesseract process per image.
+        timings/memory switch on per-stage instrumentation in the workers (see
+        instrument.configure); the numbers come back on each result.
+        cache is a dict of resultcache.configure() arguments applied in every
+        worker; give it a path so the workers share one on-disk tier.
+        duplicates is a dict of nearduplicates.configure() arguments, likewise.
+        '''
+        if isinstance(manifest, dict):
+            manifest = manifest.items()
+        workers = workers or os.cpu_count() or 1
+        max_pending = max(workers, max_pending or workers * 4)
+        jobs = ((index, image_path, dict(info or {}), structured)
+                for index, (image_path, info) in enumerate(manifest))
+
+        initargs = (ocr_pool_size, timings, memory, logging.getLogger().getEffectiveLevel(),
+                    _stage_threads_per_worker(workers), cache, duplicates)
+
+        def start_pool():
+            return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs)
+
+        pool = start_pool()
+        pending = {}           # future -> job
+        finished = {}          # index -> result, waiting for earlier images
+        unsubmitted = deque()  # jobs taken from the manifest that a broken pool refused
+        suspects = deque()     # jobs that were in flight when a worker process died
+        isolated = None        # the suspect currently being retried on its own
+        next_index = 0
+
+        def collect(futures, ready):
+            # Returns the jobs whose worker died; everything else goes to ready
+            crashed = []
+            for future in futures:
+                job = pending.pop(future)
+                try:
+                    ready.append(future.result())
+                except BrokenProcessPool:
+                    crashed.append(job)
+                except Exception as e:
+                    ready.append((job[0], job[1], None, f"{type(e).__name__}: {e}"))
+            return crashed
+
+        try:
+            while True:
+                ready = []
+                crashed = []
+                try:
+                    if suspects:
+                        # Retry the images that were in flight when a worker died one at a
+                        # time, so a second crash is pinned on the image that caused it
+                        if not pending:
+                            isolated = suspects.popleft()
+                            pending[pool.submit(_verify_job, isolated)] = isolated
+                    else:
+                        while len(pending) + len(finished) < max_pending:
+                            job = unsubmitted.popleft() if unsubmitted else next(jobs, None)
+                            if job is None:
+                                break
+                            try:
+                                pending[pool.submit(_verify_job, job)] = job
+                            except BrokenProcessPool:
+                                unsubmitted.appendleft(job)
+                                raise
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    crashed = collect(done, ready)
+                    broken = bool(crashed)
+                except BrokenProcessPool:
+                    broken = True
+
+                if broken:
+                    # Every job still in the pool fails as soon as it is marked broken
+                    crashed += collect(wait(pending)[0], ready)
+                    if isolated is not None and crashed == [isolated]:
+                        logger.error("Worker process crashed twice on %s; reporting it as failed", isolated[1])
+                        ready.append((isolated[0], isolated[1], None,
+                                      "BrokenProcessPool: the worker process crashed while verifying this image"))
+                    else:
+                        logger.error("A worker process died; restarting the pool and retrying %d image(s)",
+                                     len(crashed))
+                        suspects.extend(sorted(crashed, key=lambda job: job[0]))
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = start_pool()
+                if not pending:
+                    isolated = None
+
+                for index, image_path, output, error in ready:
+                    if ordered:
+                        finished[index] = (image_path, output, error)
+                    else:
+                        yield image_path, output, error
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+        finally:
+            pool.shutdown()
+
+    def _analyze_microprint(self, ctx):
         '''
         Enhanced microprint analysis that looks for:
         1. Fine detail patterns at multiple scales
         2. Consistent line spacing in tiny text regions
         3. High-frequency components characteristic of microprint
         '''
+        gray = ctx.gray
+        
         # 1. Multi-scale detail analysis
         kernel_sizes = [3, 5, 7]  # Different scales for detail detection
         detail_scores = []
@@ -645,23 +1687,13 @@ class wayID:
             detail_scores.append(detail_score if not np.isnan(detail_score) else 0)
         
         # 2. Line pattern analysis (microprint often has very regular patterns)
-        sobel_y = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+        sobel_y = ctx.sobel("gray", 0, 1)
         line_pattern = np.sum(np.abs(sobel_y) > 30, axis=1)  # Horizontal line detection
         line_spacing = np.diff(line_pattern)
         spacing_consistency = np.std(line_spacing[line_spacing > 0]) if len(line_spacing[line_spacing > 0]) > 0 else 100
         
-        # 3. FFT analysis for high-frequency components
-        f_transform = np.fft.fft2(gray)
-        f_shift = np.fft.fftshift(f_transform)
-        magnitude = np.abs(f_shift)
-        
-        # Look at high-frequency components (outer regions of FFT)
-        h, w = magnitude.shape
-        center_h, center_w = h//2, w//2
-        high_freq_mask = np.zeros_like(magnitude)
-        high_freq_mask[center_h-h//4:center_h+h//4, center_w-w//4:center_w+w//4] = 0
-        high_freq_mask[0:h, 0:w] = 1
-        high_freq_ratio = np.sum(magnitude * high_freq_mask) / np.sum(magnitude)
+        # 3. FFT analysis for high-frequency components (outer regions of the spectrum)
+        high_freq_ratio = ctx.spectrum.high_band_ratio
         
         # Combine scores
         detail_score = np.mean(detail_scores)
@@ -690,24 +1722,63 @@ class wayID:
         unusual_colors = np.sum((hsv[:,:,0] > 150) & (hsv[:,:,1] > 200))
         return min(100, (unusual_colors / (hsv.shape[0] * hsv.shape[1])) * 200)
 
-    def _detect_photo_tampering(self, image):
+    def _detect_photo_tampering(self, ctx, card=None):
         '''
-        Check for signs of photo manipulation with looser constraints
+        Error-level analysis (ELA): look for areas whose compression history differs.
+
+        The image is re-encoded once at ELA_QUALITY and the per-pixel error
+        (uint8 absdiff, max over channels) is averaged over ELA_BLOCK blocks.
+        Each block's error is divided by the square root of its local contrast,
+        since edges re-compress worse, and smoothed over neighbouring blocks.
+        A pasted photo or retyped field stands out against the typical (median)
+        level of the textured blocks; flat blocks (background, desk) barely
+        change on re-encoding and would pull a plain median towards zero.
+
+        card: optional corners of the card in the frame. Only blocks wholly
+        inside it are smoothed, scored and used for the reference level, so the
+        background around the card does not change the result.
+        Returns (score 0-100, heatmap) where the heatmap has one float32 value
+        per block, relative to the reference level, and 0 outside the card.
         '''
-        quality_levels = [90, 75, 60]
-        diffs = []
-        
-        for q in quality_levels:
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), q]
-            _, encoded = cv2.imencode('.jpg', image, encode_param)
-            decoded = cv2.imdecode(encoded, 1)
-            diff = np.mean(np.abs(image.astype(float) - decoded.astype(float)))
-            diffs.append(diff)
-        
-        variance = np.std(diffs) / np.mean(diffs)
-        
-        # Looser scoring
-        return min(100, variance * 150)  # Reduced multiplier
+        image = ctx.image
+        _, encoded = cv2.imencode('.jpg', image, [int(cv2.IMWRITE_JPEG_QUALITY), ELA_QUALITY])
+        decoded = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+        error = cv2.absdiff(image, decoded).max(axis=2)
+        
+        block = ELA_BLOCK
+        h, w = ctx.height - ctx.height % block, ctx.width - ctx.width % block
+        if h == 0 or w == 0:
+            return 0, np.zeros((0, 0), np.float32)
+        rows, cols = h // block, w // block
+        block_error = error[:h, :w].reshape(rows, block, cols, block).sum(axis=(1, 3), dtype=np.int32)
+        block_error = block_error.astype(np.float32) / (block * block)
+        
+        # Local contrast per block from box sums of x and x^2
+        gray = ctx.gray[:h, :w].astype(np.float32).reshape(rows, block, cols, block)
+        block_std = np.sqrt(np.maximum(np.mean(gray * gray, axis=(1, 3)) - np.mean(gray, axis=(1, 3)) ** 2, 0))
+        
+        relative = block_error / np.sqrt(block_std + 4)
+        
+        card_mask = np.ones(relative.shape, bool)
+        if card is not None:
+            outline = np.zeros(relative.shape, np.uint8)
+            cv2.fillConvexPoly(outline, np.round(np.asarray(card, np.float32) / block - 0.5).astype(np.int32), 1)
+            # Blocks on the outline mix card and background pixels
+            outline = cv2.erode(outline, np.ones((3, 3), np.uint8)).astype(bool)
+            if outline.any():
+                card_mask = outline
+        # Smooth within the card only: mean over the card blocks in each 5x5 neighbourhood
+        weight = card_mask.astype(np.float32)
+        relative = cv2.blur(relative * weight, (5, 5)) / np.maximum(cv2.blur(weight, (5, 5)), 1e-6)
+        
+        textured = card_mask & (block_std > ELA_TEXTURED_STD)
+        reference = relative[textured] if textured.any() else relative[card_mask]
+        
+        heatmap = np.where(card_mask, relative / max(float(np.median(reference)), 1e-3), 0).astype(np.float32)
+        
+        peak = float(np.percentile(heatmap[card_mask], 99))
+        self.tamper_heatmap = heatmap
+        return min(100, max(0, (peak - ELA_PEAK_BASELINE) * ELA_SCORE_SCALE)), heatmap
 
     def _enhanced_rainbow_detection(self, hsv):
         '''
@@ -759,13 +1830,13 @@ class wayID:
         
         return min(100, rainbow_score)
 
-    def _enhanced_color_transitions(self, hsv):
+    def _enhanced_color_transitions(self, ctx):
         '''
         Enhanced color transition detection
         '''
         # Calculate gradients in both directions
-        gradient_x = cv2.Sobel(hsv[:,:,0], cv2.CV_64F, 1, 0, ksize=3)
-        gradient_y = cv2.Sobel(hsv[:,:,0], cv2.CV_64F, 0, 1, ksize=3)
+        gradient_x = ctx.sobel("hue", 1, 0)
+        gradient_y = ctx.sobel("hue", 0, 1)
         
         # Calculate magnitude and direction
         gradient_magnitude = np.sqrt(gradient_x**2 + gradient_y**2)
@@ -783,26 +1854,58 @@ class wayID:
         
         return min(100, transition_score * 2)
 
-    def _analyze_texture_uniformity(self, gray):
+    def _analyze_texture_uniformity(self, ctx):
         '''
-        Improved texture uniformity analysis
+        Improved texture uniformity analysis: multi-scale local variance plus an LBP histogram
         '''
-        # Use Local Binary Pattern (LBP) for better texture analysis
-        kernel_size = 3
-        local_std = np.zeros_like(gray, dtype=float)
-        
-        # Calculate local standard deviation with smaller kernel
-        for i in range(kernel_size//2, gray.shape[0]-kernel_size//2):
-            for j in range(kernel_size//2, gray.shape[1]-kernel_size//2):
-                patch = gray[i-kernel_size//2:i+kernel_size//2+1, 
-                           j-kernel_size//2:j+kernel_size//2+1]
-                local_std[i,j] = np.std(patch)
+        gray = ctx.gray
+        
+        # 1. Local standard deviation at several window sizes, from box filters of x and x^2
+        variation_scores = []
+        for kernel_size in TEXTURE_SCALES:
+            local_std = self._local_std(gray, kernel_size)
+            r = kernel_size // 2
+            local_std = local_std[r:local_std.shape[0]-r, r:local_std.shape[1]-r]  # Full windows only
+            mean_std = np.mean(local_std)
+            if mean_std == 0:
+                variation_scores.append(100)  # Perfectly flat image
+                continue
+            
+            # Real IDs should have a mix of uniform and detailed areas
+            texture_variation = np.std(local_std) / mean_std
+            
+            # Score where too uniform (low variation) or too random (high variation) is bad
+            variation_scores.append(min(100, abs(texture_variation - 0.5) * 100))
         
-        # Real IDs should have a mix of uniform and detailed areas
-        texture_variation = np.std(local_std) / np.mean(local_std)
+        # 2. Local Binary Pattern histogram: printed and photographed cards produce a
+        # broad spread of micro-patterns, digitally generated ones collapse onto a few
+        hist = self._lbp_histogram(gray)
+        probabilities = hist[hist > 0] / hist.sum()
+        entropy = -np.sum(probabilities * np.log2(probabilities))  # 0-8 bits
+        lbp_score = (1 - entropy / 8) * 100
         
-        # Score where too uniform (low variation) or too random (high variation) is bad
-        return min(100, abs(texture_variation - 0.5) * 100)
+        return min(100, np.mean(variation_scores) * 0.6 + lbp_score * 0.4)
+
+    def _local_std(self, gray, kernel_size):
+        '''
+        Standard deviation over every kernel_size x kernel_size window (E[x^2] - E[x]^2)
+        '''
+        x = gray.astype(np.float32)
+        mean = cv2.blur(x, (kernel_size, kernel_size))
+        mean_sq = cv2.blur(x * x, (kernel_size, kernel_size))
+        return np.sqrt(np.maximum(mean_sq - mean * mean, 0))
+
+    def _lbp_histogram(self, gray):
+        '''
+        256-bin histogram of 8-neighbour Local Binary Pattern codes (interior pixels)
+        '''
+        center = gray[1:-1, 1:-1]
+        h, w = center.shape
+        codes = np.zeros((h, w), np.uint8)
+        neighbours = [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (2, 1), (2, 0), (1, 0)]
+        for bit, (dy, dx) in enumerate(neighbours):
+            codes |= (gray[dy:dy+h, dx:dx+w] >= center).astype(np.uint8) << bit
+        return np.bincount(codes.ravel(), minlength=256)
 
     def _analyze_color_distribution(self, hsv):
         '''
@@ -848,19 +1951,21 @@ class wayID:
         # Combine metrics (higher continuity and consistent multi-scale edges are good)
         return min(100, (edge_ratio * 50 + continuity * 50))
 
-    def _detect_cartoon(self, image, gray):
+    def _detect_cartoon(self, ctx, stride=1):
         '''
         Simplified cartoon detection focusing on:
         1. Presence of solid colors
         2. Sharp color boundaries
         3. Limited color palette
+        
+        stride > 1 counts the palette on every stride-th pixel in each direction.
         '''
-        # Convert to HSV for better color analysis
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        hsv = ctx.hsv
+        gray = ctx.gray
         
         # 1. Check for solid color regions (cartoons have large areas of same color)
         blur = cv2.medianBlur(gray, 5)
-        diff = np.abs(gray - blur)
+        diff = cv2.absdiff(gray, blur)
         solid_color_ratio = np.sum(diff < 5) / diff.size  # More strict threshold
         solid_color_score = solid_color_ratio * 100
         
@@ -869,11 +1974,11 @@ class wayID:
         edge_score = np.count_nonzero(edges) / edges.size * 100
         
         # 3. Count distinct colors (cartoons use fewer colors)
-        # Quantize colors more aggressively
-        colors = hsv.reshape(-1, 3)
-        colors = np.round(colors / 32) * 32  # Quantize to fewer colors
-        unique_colors = np.unique(colors, axis=0)
-        color_count = len(unique_colors)
+        # Quantize each channel to round(value / 32), i.e. 0-8, pack the three levels
+        # into one integer and count the occupied histogram bins
+        levels = cv2.LUT(hsv[::stride, ::stride], _PALETTE_LEVELS)
+        keys = (levels[:, :, 0].astype(np.int32) * 81 + levels[:, :, 1] * 9 + levels[:, :, 2]).ravel()
+        color_count = np.count_nonzero(np.bincount(keys, minlength=729))
         color_score = max(0, 100 - (color_count / 50))  # Fewer colors = higher score
         
         # Calculate final score with heavy emphasis on solid colors and limited palette
@@ -897,11 +2002,40 @@ class wayID:
 
     def _prepare_for_ocr(self, gray):
         '''
-        Prepare image for OCR
+        Prepare image for OCR: contrast, denoise and binarize.
+
+        "quality" mode is the original full-resolution non-local-means pipeline.
+        "fast" mode first downsamples to OCR_TARGET_DPI (assuming the frame is
+        mostly card), then uses a median filter and adaptive thresholding.
+        Per-stage wall time is recorded in self.preprocess_timings (and, when
+        instrumented, as ocr_prep.<stage> in the verification's timings).
         '''
-        contrast = cv2.convertScaleAbs(gray, alpha=1.75, beta=0)
-        denoised = cv2.fastNlMeansDenoising(contrast, None, 5, 7, 21)
-        _, binary = cv2.threshold(denoised, 127, 255, cv2.THRESH_BINARY)
+        timings = self.preprocess_timings = {}
+        
+        def timed(stage, func, *args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings[stage] = time.perf_counter() - start
+            self._recorder.add(f"ocr_prep.{stage}", timings[stage])
+            return result
+        
+        if self.preprocess_mode == "quality":
+            contrast = timed("contrast", cv2.convertScaleAbs, gray, alpha=1.75, beta=0)
+            denoised = timed("denoise", cv2.fastNlMeansDenoising, contrast, None, 5, 7, 21)
+            _, binary = timed("threshold", cv2.threshold, denoised, 127, 255, cv2.THRESH_BINARY)
+            return binary
+        if self.preprocess_mode != "fast":
+            raise ValueError(f"Unknown preprocess_mode: {self.preprocess_mode}")
+        
+        # Never upsample; only shrink captures that exceed the target DPI
+        target_width = CARD_WIDTH_INCHES * OCR_TARGET_DPI
+        scale = target_width / max(gray.shape[:2])
+        if scale < 1:
+            gray = timed("resize", cv2.resize, gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        contrast = timed("contrast", cv2.convertScaleAbs, gray, alpha=1.75, beta=0)
+        denoised = timed("denoise", cv2.medianBlur, contrast, 3)
+        binary = timed("threshold", cv2.adaptiveThreshold, denoised, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                       cv2.THRESH_BINARY, 31, 15)
         return binary
 
     def _calculate_blur_score(self, gray):
@@ -918,12 +2052,6 @@ class wayID:
         MIN_ACCEPTABLE = 100  # Lower bound of acceptable range
         MAX_ACCEPTABLE = 5000  # Upper bound of acceptable range
         
-        # Debug information
-        print(f"\nBlur analysis for {os.path.basename(self.image_path)}:")
-        print(f"Raw blur variance: {blur_var:.2f}")
-        print(f"Acceptable range: {MIN_ACCEPTABLE} - {MAX_ACCEPTABLE}")
-        print(f"Optimal blur: {PERFECT_BLUR}")
-
         # Calculate score (inverted from previous version)
         if blur_var < MIN_ACCEPTABLE:
             # Too blurry - bad
@@ -938,7 +2066,9 @@ class wayID:
             distance_from_perfect = abs(blur_var - PERFECT_BLUR) / (MAX_ACCEPTABLE - MIN_ACCEPTABLE)
             score = max(0, min(100, distance_from_perfect * 50))  # Bound between 0-100
 
-        print(f"Final blur score: {score:.2f}/100 (lower is better)")
+        if self._debug is not None:
+            self._debug["blur"] = {"variance": round(float(blur_var), 2), "score": round(float(score), 2),
+                                   "acceptable": [MIN_ACCEPTABLE, MAX_ACCEPTABLE], "optimal": PERFECT_BLUR}
         
         return score
 
@@ -961,10 +2091,12 @@ class wayID:
         
         return min(100, (1 - official_color_ratio) * 100)
 
-    def _detect_security_features(self, gray):
+    def _detect_security_features(self, ctx):
         '''
         Detect common security features in IDs
         '''
+        gray = ctx.gray
+
         # Look for fine detail patterns
         kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
         detail = cv2.filter2D(gray, -1, kernel)
@@ -973,12 +2105,10 @@ class wayID:
         detail_score = np.std(detail) / np.mean(detail)
         
         # Look for regular patterns (guilloche)
-        fourier = np.fft.fft2(gray)
-        fourier_shift = np.fft.fftshift(fourier)
-        magnitude = np.abs(fourier_shift)
+        spectrum = ctx.spectrum
         
         # Check for regular pattern presence
-        pattern_score = np.std(magnitude) / np.mean(magnitude)
+        pattern_score = spectrum.std / spectrum.mean
         
         return min(100, 100 - ((detail_score + pattern_score) * 50))
 
@@ -1006,17 +2136,16 @@ class wayID:
         
         return min(100, spacing_consistency * 100)
 
-    def _validate_headshot(self, image):
+    def _validate_headshot(self, ctx):
         """
         Analyzes the headshot/photo region of an ID to detect suspicious characteristics
         Returns a score (0-100, where higher is more suspicious) and list of issues
         """
-        height, width = image.shape[:2]
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        image = ctx.image
+        height, width = ctx.height, ctx.width
+        gray = ctx.gray
         
-        # Initialize face detection
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+        faces = self._detect_faces(gray)
         
         issues = []
         score = 0
@@ -1076,48 +2205,112 @@ class wayID:
                 issues.append("Unusual edge patterns in photo")
             
             # Check for color consistency
-            hsv = cv2.cvtColor(face_region, cv2.COLOR_BGR2HSV)
+            hsv = ctx.hsv[y:y+h, x:x+w]
             if np.std(hsv[:,:,1]) < 8:  # More lenient
                 score += 10  # Reduced from 15
                 issues.append("Suspiciously uniform photo coloring")
             
         except Exception as e:
-            print(f"Warning: Additional photo checks failed: {str(e)}")
+            logger.warning("Additional photo checks failed for %s: %s", self._image_label(), e)
         
         return min(100, score), issues
 
+    def _detect_faces(self, gray):
+        '''
+        Fast face detection for the ID photo.
+
+        Only the left part of the card (where the portrait is printed) is
+        searched, downscaled to HEADSHOT_DETECT_HEIGHT rows, with the cascade's
+        min/max window derived from the expected face-to-card area ratio.
+        Returns face boxes in full-resolution coordinates.
+        '''
+        height, width = gray.shape[:2]
+        region = gray[:, :max(1, int(width * HEADSHOT_REGION_WIDTH))]
+        scale = min(1.0, HEADSHOT_DETECT_HEIGHT / height)
+        if scale < 1:
+            region = cv2.resize(region, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
+        # Haar boxes are square: side = sqrt(area ratio * card area), in detection pixels
+        card_area = width * height * scale * scale
+        min_side = int(np.sqrt(HEADSHOT_FACE_RATIO[0] * card_area))
+        max_side = int(min(np.sqrt(HEADSHOT_FACE_RATIO[1] * card_area), *region.shape[:2]))
+        if max_side <= min_side:
+            return np.empty((0, 4), int)
+        
+        faces = _detect_with_cascade(region, (min_side, min_side), (max_side, max_side))
+        if len(faces) == 0:
+            return np.empty((0, 4), int)
+        return np.round(np.asarray(faces) / scale).astype(int)
+
     def _analyze_metadata(self):
-        findings = []
+        '''
+        (score, findings) from the file name and timestamps and from the encoded file's EXIF and format
+        '''
+        self.metadata_checks = self._content_metadata_checks()
+        return self._score_metadata(self._file_metadata_checks() + self.metadata_checks)
+
+    @staticmethod
+    def _score_metadata(checks):
+        '''
+        Add up (points, finding) checks in order; negative points lower the score, but not below 0
+        '''
         score = 0
+        findings = []
+        for points, finding in checks:
+            score = max(0, score + points)
+            if finding:
+                findings.append(finding)
+        return min(100, score), findings
+
+    def _file_extension(self):
+        ctx = self.context
+        return os.path.splitext(ctx.path)[1].lower() if ctx.path else ''
+
+    def _file_metadata_checks(self):
+        '''
+        Checks on the file name and timestamps, which change without the image bytes changing
+        '''
+        checks = []
+        # Check file extension - expanded list for phone formats
+        valid_extensions = {
+            '.jpg', '.jpeg', '.png', '.heic', '.mpo',  # Added .mpo
+            '.heif', '.dng', '.raw'  # Other common phone formats
+        }
+        ctx = self.context
+        file_ext = self._file_extension()
+        if ctx.path and file_ext not in valid_extensions:
+            checks.append((25, f"Unusual file extension: {file_ext}"))
         
-        try:
-            # Check file extension - expanded list for phone formats
-            valid_extensions = {
-                '.jpg', '.jpeg', '.png', '.heic', '.mpo',  # Added .mpo
-                '.heif', '.dng', '.raw'  # Other common phone formats
-            }
-            file_ext = os.path.splitext(self.image_path)[1].lower()
-            if file_ext not in valid_extensions:
-                score += 25
-                findings.append(f"Unusual file extension: {file_ext}")
-            
-            # Get file stats
-            file_stats = os.stat(self.image_path)
+        # File stats were captured when the image was read; in-memory images have none
+        if ctx.stat is not None:
             current_time = time.time()
             
             # Check file timestamps - only very recent modifications are suspicious
             time_diffs = {
-                'modified': current_time - file_stats.st_mtime,
-                'accessed': current_time - file_stats.st_atime
+                'modified': current_time - ctx.stat.st_mtime,
+                'accessed': current_time - ctx.stat.st_atime
             }
             
             # Only flag if modified in last 5 minutes (suggests active tampering)
             if time_diffs['modified'] < 300:
-                score += 10
-                findings.append("File modified very recently")
-            
-            # Read image metadata
-            with Image.open(self.image_path) as img:
+                checks.append((10, "File modified very recently"))
+        return checks
+
+    def _content_metadata_checks(self):
+        '''
+        EXIF, format and JPEG checks on the encoded bytes (and the extension: a .jpg
+        file is always checked as a JPEG), as (points, finding or None) in order
+        '''
+        checks = []
+        ctx = self.context
+        # An already-decoded array has no encoded bytes, so no EXIF or format to check
+        if ctx.data is None:
+            return checks
+        
+        try:
+            file_ext = self._file_extension()
+            # Read image metadata from the encoded bytes
+            with ctx.open_pil() as img:
                 try:
                     exif = {
                         TAGS[key]: value
@@ -1142,85 +2335,112 @@ class wayID:
                         if tag in exif:
                             software = str(exif[tag]).lower()
                             if any(editor in software for editor in editing_software):
-                                score += 35
-                                findings.append(f"Image edited with {exif[tag]}")
+                                checks.append((35, f"Image edited with {exif[tag]}"))
                             elif any(phone in software for phone in phone_software):
                                 # Reduce score if it's from a phone camera
-                                score = max(0, score - 10)
-                                findings.append("Image from phone camera")
+                                checks.append((-10, "Image from phone camera"))
                     
                 except Exception as e:
                     # Don't penalize for missing EXIF - common with phone photos
-                    print(f"Info: No EXIF data found")
+                    logger.debug("No EXIF data found in %s", self._image_label())
                 
                 # Check image format and compression
                 format_name = img.format.upper()
                 if format_name not in ['JPEG', 'PNG', 'HEIC', 'MPO', 'DNG', 'RAW']:  # Added MPO and others
-                    score += 20
-                    findings.append(f"Unusual image format: {format_name}")
+                    checks.append((20, f"Unusual image format: {format_name}"))
                 elif format_name in ['MPO', 'HEIC']:  # Common phone formats
-                    score = max(0, score - 10)  # Reduce score for phone formats
+                    checks.append((-10, None))  # Reduce score for phone formats
                 
                 # Check for multiple save operations (JPEG/JPG)
                 if format_name == 'JPEG' or file_ext in ['.jpg', '.jpeg']:
                     try:
-                        quality_estimate = self._estimate_jpeg_quality(img)
+                        quality_estimate = self._recorder.timed("metadata.jpeg_quality", self._estimate_jpeg_quality, img)
                         # Only flag very low quality
                         if quality_estimate < 50:
-                            score += 15
-                            findings.append("Suspiciously low JPEG quality")
+                            checks.append((15, "Suspiciously low JPEG quality"))
+                        
+                        # A lower-quality save followed by a re-save leaves periodic gaps
+                        # in the DCT coefficient histograms
+                        double_compression = self._recorder.timed("metadata.double_compression",
+                                                                   self._detect_double_compression, img, ctx)
+                        if double_compression > DOUBLE_COMPRESSION_THRESHOLD:
+                            checks.append((15, "JPEG was re-compressed (double quantization)"))
                     except Exception as e:
-                        print(f"Info: Could not estimate JPEG quality")
+                        logger.debug("Could not estimate JPEG quality of %s: %s", self._image_label(), e)
                 
         except Exception as e:
-            score += 15
-            findings.append(f"Error analyzing metadata: {str(e)}")
+            checks.append((15, f"Error analyzing metadata: {str(e)}"))
         
-        return min(100, score), findings
+        return checks
 
     def _estimate_jpeg_quality(self, img):
         """
-        Estimates the JPEG quality setting
+        Estimates the JPEG quality setting from the file's quantization tables.
+
+        Finds the libjpeg quality (1-100) whose scaled reference tables are
+        closest to the tables stored in the file; no re-encoding is needed.
         """
-        # Save image to buffer at different quality levels
-        qualities = [20, 40, 60, 80, 90, 95, 98, 100]
-        sizes = []
-        original_size = 0
-        
-        # Get original file size
-        buffer = io.BytesIO()
-        img.save(buffer, format='JPEG', quality=100)
-        original_size = len(buffer.getvalue())
+        tables = getattr(img, 'quantization', None)
+        if not tables:
+            raise ValueError("Image has no JPEG quantization tables")
         
-        # Get sizes at different quality levels
-        for q in qualities:
-            buffer = io.BytesIO()
-            img.save(buffer, format='JPEG', quality=q)
-            sizes.append(len(buffer.getvalue()))
+        luminance = np.asarray(tables[0], dtype=np.int32)
+        errors = np.abs(_IJG_LUMINANCE_BY_QUALITY - luminance).sum(axis=1)
+        if 1 in tables:
+            chrominance = np.asarray(tables[1], dtype=np.int32)
+            errors += np.abs(_IJG_CHROMINANCE_BY_QUALITY - chrominance).sum(axis=1)
         
-        # Find closest match
-        size_diffs = [abs(size - original_size) for size in sizes]
-        estimated_quality = qualities[np.argmin(size_diffs)]
+        return int(np.argmin(errors)) + 1
+
+    def _detect_double_compression(self, img, ctx):
+        """
+        Double-quantization score from the luminance DCT coefficient histograms.
+
+        Each 8x8 block of the decoded Y plane is transformed back to DCT space
+        and divided by the file's quantization step. A JPEG compressed once gives
+        smooth, Laplacian-shaped histograms of the low-frequency coefficients;
+        one that was first saved at a lower quality shows periodic peaks and
+        gaps. Returns the mean normalized second difference of those histograms:
+        0.06-0.38 for a single save (highest around q85-92), 0.9-1.5 for a
+        re-save at a higher quality (see DOUBLE_COMPRESSION_THRESHOLD).
+        """
+        table = np.asarray(img.quantization[0], dtype=np.float32).reshape(8, 8)
         
-        return estimated_quality
+        # The decoded context is only block-aligned with the file if no EXIF rotation was applied
+        if img.getexif().get(0x0112, 1) == 1 and (ctx.width, ctx.height) == img.size:
+            luma = ctx.ycrcb[:, :, 0]
+        else:
+            luma = np.asarray(img.convert('L'))
+        
+        h, w = luma.shape[0] - luma.shape[0] % 8, luma.shape[1] - luma.shape[1] % 8
+        blocks = (luma[:h, :w].astype(np.float32) - 128).reshape(h // 8, 8, w // 8, 8).swapaxes(1, 2).reshape(-1, 8, 8)
+        coefficients = _DCT_MATRIX @ blocks @ _DCT_MATRIX.T
+        
+        scores = []
+        for i, j in DOUBLE_COMPRESSION_COEFFICIENTS:
+            levels = np.abs(np.rint(coefficients[:, i, j] / table[i, j])).astype(np.int32)
+            hist = np.bincount(levels, minlength=22)[1:21].astype(np.float64)
+            if hist.sum() < 200:
+                continue  # Too few non-zero coefficients to judge
+            second_difference = hist[1:-1] - (hist[:-2] + hist[2:]) / 2
+            scores.append(np.abs(second_difference).sum() / hist.sum())
+        
+        return float(np.mean(scores)) if scores else 0.0
 
-    def _calculate_color_transitions(self, hsv_image):
+    def _calculate_color_transitions(self, ctx):
         """
         Calculate the number of significant color transitions in the HSV image.
         This can help detect fake IDs that might have unusual color patterns.
         
         Args:
-            hsv_image: Image in HSV color space
+            ctx: ImageContext of the ID image (uses its hue gradients)
             
         Returns:
             int: Number of significant color transitions found
         """
-        # Extract the hue channel
-        hue = hsv_image[:, :, 0]
-        
-        # Calculate horizontal and vertical gradients
-        gradient_x = cv2.Sobel(hue, cv2.CV_64F, 1, 0, ksize=3)
-        gradient_y = cv2.Sobel(hue, cv2.CV_64F, 0, 1, ksize=3)
+        # Horizontal and vertical gradients of the hue channel
+        gradient_x = ctx.sobel("hue", 1, 0)
+        gradient_y = ctx.sobel("hue", 0, 1)
         
         # Calculate gradient magnitude
         gradient_magnitude = np.sqrt(gradient_x**2 + gradient_y**2)
@@ -1229,4 +2449,150 @@ class wayID:
         threshold = 30
         transitions = np.sum(gradient_magnitude > threshold)
         
-        return int(transitions)
\ No newline at end of file
+        return int(transitions)
+
+
+# Threads that run one verification's independent stages side by side (0 or 1 = in sequence)
+_stage_threads = min(4, os.cpu_count() or 1)
+_stage_pool = None
+_stage_pool_lock = threading.Lock()
+
+
+def configure_stage_threads(threads):
+    '''
+    Set how many threads a single verification may use for its independent stages.
+
+    Use 0 when images are already verified in parallel on every core (e.g. one
+    worker process per core), where extra threads only add contention.
+    '''
+    global _stage_threads, _stage_pool
+    with _stage_pool_lock:
+        _stage_threads = threads
+        previous, _stage_pool = _stage_pool, None
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def _stage_thread_pool():
+    '''
+    Shared threads for _run_stages_parallel, or None when stages should run in sequence
+    '''
+    global _stage_pool
+    with _stage_pool_lock:
+        if _stage_threads <= 1:
+            return None
+        if _stage_pool is None:
+            _stage_pool = ThreadPoolExecutor(max_workers=_stage_threads, thread_name_prefix="wayid-stage")
+        return _stage_pool
+
+
+def _stage_threads_per_worker(workers):
+    '''
+    Stage threads for each of `workers` processes so they add up to about one per core
+    '''
+    threads = (os.cpu_count() or 1) // max(1, workers)
+    return min(4, threads) if threads > 1 else 0
+
+
+def _run_stage_graph(stages, pool, timed):
+    '''
+    Run {name: (dependency names, func)} on pool, each stage once its dependencies are done.
+
+    func is called with its dependencies' results, in order. Returns {name: result}.
+    If a stage raises, the stages not yet started are cancelled and the error re-raised.
+    Stage functions must not wait on work submitted to the same pool.
+    '''
+    results = {}
+    waiting = dict(stages)
+    pending = {}
+    
+    def submit_ready():
+        for name, (dependencies, func) in list(waiting.items()):
+            if all(dependency in results for dependency in dependencies):
+                del waiting[name]
+                args = [results[dependency] for dependency in dependencies]
+                pending[pool.submit(timed, name, func, *args)] = name
+    
+    try:
+        submit_ready()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+            submit_ready()
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+    if waiting:
+        raise ValueError(f"Stages with unmet dependencies: {', '.join(sorted(waiting))}")
+    return results
+
+
+def _init_worker(ocr_pool_size, timings, memory, log_level, stage_threads=0, cache=None, duplicates=None):
+    '''
+    Process-pool initializer (verify_batch, service.py): OCR backend, instrumentation,
+    logging, stage threads, result cache, near-duplicate index and face cascade
+    '''
+    logconfig.configure_worker(log_level)
+    ocr.configure(ocr_pool_size)
+    instrument.configure(timings, memory)
+    configure_stage_threads(stage_threads)
+    resultcache.configure(**(cache or {}))
+    nearduplicates.configure(**(duplicates or {}))
+    # Load the lazily created state now rather than on the first image (stage
+    # threads, if any, load their own face cascade on first use)
+    _load_face_cascade()
+    _ocr_thread_pool()
+
+
+def _verify_job(job):
+    '''
+    Process-pool entry point for verify_batch: verify one image, never raise
+    '''
+    index, image_path, info, structured = job
+    try:
+        checker = wayID(image_path, **info)
+        return index, image_path, checker.verify() if structured else checker.output(), None
+    except Exception as e:
+        return index, image_path, None, f"{type(e).__name__}: {e}"
+
+
+_ocr_threads = None
+_ocr_threads_lock = threading.Lock()
+
+
+def _ocr_thread_pool():
+    '''
+    Shared threads for region OCR; the OCR backends block outside the GIL
+    '''
+    global _ocr_threads
+    with _ocr_threads_lock:
+        if _ocr_threads is None:
+            _ocr_threads = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1) * 2,
+                                              thread_name_prefix="wayid-ocr")
+        return _ocr_threads
+
+
+_face_cascades = threading.local()
+
+
+def _load_face_cascade():
+    '''
+    The frontal-face Haar cascade of the calling thread, loaded on its first use.
+    CascadeClassifier is not documented as thread-safe, so threads do not share one.
+    '''
+    cascade = getattr(_face_cascades, "cascade", None)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        if cascade.empty():
+            raise RuntimeError("Could not load haarcascade_frontalface_default.xml")
+        _face_cascades.cascade = cascade
+    return cascade
+
+
+def _detect_with_cascade(gray, min_size, max_size):
+    '''
+    Run the frontal-face Haar cascade; threads run it concurrently, each on its own classifier
+    '''
+    return _load_face_cascade().detectMultiScale(gray, 1.1, 4, minSize=min_size, maxSize=max_size)